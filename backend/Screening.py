@@ -1,22 +1,40 @@
 import os
+import sys
+import time
+import argparse
 import numpy as np
 import pandas as pd
 from flask import Flask, render_template, request, jsonify
 from flasgger import Swagger, swag_from
 import json
-from pickle import load
 
 # Local Imports
-from functions.models import train_model, analyze_numerical_features
+from functions.models import train_model, train_model_out_of_core, analyze_numerical_features, load_model_artifacts, load_drift_reference, DEFAULT_LOSS_TOLERANCE
+from functions.category_index import build_category_index, split_categories, CATEGORY_MATCHES
+from functions.request_parsing import FeatureParser, RequestValidationError, read_request_payload, parse_flag
+from functions.explain import TreeExplainer
+from functions.audit_log import AuditLog, file_version
+from functions.drift import DriftMonitor
+from functions.feature_store import LiveFeatureStore
 
 base_path = os.path.dirname(os.path.abspath(__file__))
 data_path = os.path.join(base_path, 'data/csvs')
-pkl_path = os.path.join(base_path, 'data/pkls')
+pkl_path = os.environ.get('SCREENING_MODEL_DIR', os.path.join(base_path, 'data/pkls'))
 template_path = os.path.join(base_path, '../frontend/templates')
 static_path = os.path.join(base_path, '../frontend/static')
+feature_store_path = os.environ.get('SCREENING_FEATURE_STORE', os.path.join(base_path, 'data/feature_store'))
 csv_path = os.path.join(base_path, 'data/csvs/unique_filtered_final_with_target_variable.csv')
+openapi_path = os.path.join(base_path, '../openapi.json')
+
+# Fast-start mode (set by gunicorn.conf.py) serves the OpenAPI spec prebuilt
+# into openapi.json at build time instead of building it from the routes,
+# both at /openapi.json and behind the interactive docs at /apidocs.
+# SCREENING_API_DOCS=0 turns the interactive docs off.
+fast_start = os.environ.get('SCREENING_FAST_START') == '1'
+api_docs = os.environ.get('SCREENING_API_DOCS', '1') == '1'
 
 df = None # pd.read_csv(csv_path)
+category_index = build_category_index(df) if df is not None else None
 
 swagger_template = {
     "swagger": "2.0",
@@ -38,7 +56,7 @@ swagger_template = {
 
 
 app = Flask(__name__, template_folder=template_path, static_folder=static_path)
-swagger = Swagger(app, template=swagger_template)
+swagger = Swagger(app, template=swagger_template) if api_docs else None
 
 # List of required files
 required_files = [
@@ -58,14 +76,48 @@ if missing_files:
     quit
 else:
     # Load the files if all are present
-    with open(os.path.join(pkl_path, 'final_model.pkl'), 'rb') as file:
-        classifier = load(file)
-    with open(os.path.join(pkl_path, 'label_encoders.pkl'), 'rb') as file:
-        encoders = load(file)
-    with open(os.path.join(pkl_path, 'column_names.pkl'), 'rb') as file:
-        column_names = load(file)
-    with open(os.path.join(pkl_path, 'target_encoder.pkl'), 'rb') as file:
-        target_encoder = load(file)
+    classifier, encoders, column_names, target_encoder = load_model_artifacts(pkl_path)
+
+    def encode_and_handle_unseen(column, value):
+        return encoders[column].encode(value)
+
+    feature_parser = FeatureParser(column_names, encode_and_handle_unseen)
+    model_fields = set(feature_parser.model_fields)
+    model_version = file_version(os.path.join(pkl_path, 'final_model.pkl'))
+
+    # Every score is recorded off the request thread (see functions/audit_log.py)
+    audit_log = AuditLog(os.environ.get('SCREENING_AUDIT_DIR', os.path.join(base_path, 'data/audit')),
+                         column_names,
+                         model_version,
+                         max_file_seconds=float(os.environ.get('SCREENING_AUDIT_ROTATE_SECONDS', 10)),
+                         overflow=os.environ.get('SCREENING_AUDIT_OVERFLOW', 'drop_oldest'))
+
+    # Encoded feature vectors of known companies for /predict/by-id; a newly
+    # published store is picked up within a few seconds without a restart
+    feature_store = LiveFeatureStore(feature_store_path, column_names, model_version)
+
+    # Live feature distributions vs. the training reference, merged across workers
+    drift_reference = load_drift_reference(pkl_path)
+    if drift_reference is None:
+        print("Drift monitoring disabled: drift_reference.pkl is missing, retrain the model to create it")
+        drift_monitor = None
+    else:
+        drift_monitor = DriftMonitor(drift_reference, column_names, encoders,
+                                     directory=os.environ.get('SCREENING_DRIFT_DIR', os.path.join(base_path, 'data/drift')),
+                                     publish_interval=float(os.environ.get('SCREENING_DRIFT_PUBLISH_SECONDS', 30)),
+                                     window=float(os.environ.get('SCREENING_DRIFT_WINDOW_SECONDS', 3600)),
+                                     model_version=model_version)
+
+    try:
+        explainer = TreeExplainer(classifier, column_names)
+    except ValueError as e:
+        print(f"Explanations disabled: {e}")
+        explainer = None
+
+    # Rows are built in column_names order by the parser, so skip sklearn's
+    # per-call feature name check which would otherwise warn on plain arrays.
+    if list(getattr(classifier, 'feature_names_in_', column_names)) == list(column_names):
+        classifier.__dict__.pop('feature_names_in_', None)
 
 ### Routes:
 
@@ -83,69 +135,87 @@ def predict_get():
 @app.route("/predict", methods=["POST"])
 @swag_from('yml_files/predict_post.yml')
 def predict():
-    if request.method == "POST":
-        try:
-            new_company_info = {
-                'country_code': request.form['company_country_code'],
-                'region': request.form['company_region'],
-                'city': request.form['company_city'],
-                'category_list': request.form['company_category_list'],
-                'last_round_investment_type': request.form['company_last_round_investment_type'],
-                'num_funding_rounds': int(request.form['company_num_funding_rounds']),
-                'total_funding_usd': float(request.form['company_total_funding_usd'].replace(',', '')),
-                'age_months': int(request.form['company_age_months']),
-                'has_facebook_url': int(request.form.get('company_has_facebook_url', 0)),
-                'has_twitter_url': int(request.form.get('company_has_twitter_url', 0)),
-                'has_linkedin_url': int(request.form.get('company_has_linkedin_url', 0)),
-                'round_count': int(request.form['company_round_count']),
-                'raised_amount_usd': float(request.form['company_raised_amount_usd'].replace(',', '')),
-                'last_round_raised_amount_usd': float(request.form['company_last_round_raised_amount_usd'].replace(',', '')),
-                'last_round_post_money_valuation': float(request.form['company_last_round_post_money_valuation'].replace(',', '')),
-                'last_round_timelapse_months': int(request.form['company_last_round_timelapse_months']),
-                'last_round_investor_count': int(request.form['company_last_round_investor_count']),
-                'founders_dif_country_count': int(request.form['company_founders_dif_country_count']),
-                'founders_male_count': int(request.form['company_founders_male_count']),
-                'founders_female_count': int(request.form['company_founders_female_count']),
-                'founders_degree_count_total': int(request.form['company_founders_degree_count_total']),
-                'founders_degree_count_max': int(request.form['company_founders_degree_count_max'])
-            }
-
-            def encode_and_handle_unseen(column, value):
-                encoder = encoders[column]
-                if value not in encoder.classes_:
-                    encoder.classes_ = np.append(encoder.classes_, value)
-                return encoder.transform([value])[0]
-
-            new_company_df = pd.DataFrame([new_company_info])
-
-            categorical_columns = [
-                'country_code', 'region', 'city', 'category_list',
-                'last_round_investment_type'
-            ]
-            for col in categorical_columns:
-                new_company_df[col] = new_company_df[col].apply(lambda x: encode_and_handle_unseen(col, x))
-
-            new_company_df = new_company_df.reindex(columns=column_names, fill_value=0)
-            
-            prediction = int(classifier.predict(new_company_df)[0])
-            confidence = float(classifier.predict_proba(new_company_df)[:, 1][0])
-            confidence = confidence * 100
-            if prediction == 0:
-                confidence = 100 - confidence
-            prediction_name = "Closed/No Event" if prediction == 0 else "Funding Round/Acquisition/IPO"
-
-            results = {
-                "Prediction": prediction_name,
-                "Confidence": f"{confidence:.2f}"
+    started = time.perf_counter()
+    try:
+        payload = read_request_payload(request)
+        new_company_row = feature_parser.parse(payload)
+        explain = parse_flag(request.args.get('explain', payload.get('explain')))
+        if explain and explainer is None:
+            raise RequestValidationError("Explanations are not supported for the served model")
+    except RequestValidationError as e:
+        return jsonify(e.to_dict()), e.status_code
+
+    return score_company_row(new_company_row, explain, started)
+
+@app.route("/predict/by-id", methods=["POST"])
+@swag_from('yml_files/predict_by_id_post.yml')
+def predict_by_id():
+    started = time.perf_counter()
+    store = feature_store.current()
+    if store is None:
+        return jsonify(error="The feature store is not available, build it with 'python backend/Screening.py feature-store'"), 503
+
+    try:
+        payload = read_request_payload(request)
+        uuid_org = payload.get('uuid_org')
+        if not isinstance(uuid_org, str) or not uuid_org:
+            raise RequestValidationError("Invalid input data", [{'field': 'uuid_org', 'message': 'This field is required.'}])
+        stored_row = store.vector(uuid_org)
+        if stored_row is None:
+            return jsonify(error=f"No company with uuid_org {uuid_org} in the feature store"), 404
+
+        # Start from the stored features and apply any /predict fields as overrides
+        company_row = feature_parser.row_buffer()
+        company_row[0] = stored_row
+        feature_parser.parse(payload, out=company_row, partial=True)
+        explain = parse_flag(request.args.get('explain', payload.get('explain')))
+        if explain and explainer is None:
+            raise RequestValidationError("Explanations are not supported for the served model")
+    except RequestValidationError as e:
+        return jsonify(e.to_dict()), e.status_code
+
+    # Fields the served model does not use are validated but cannot change the score
+    given = [field for field in feature_parser.fields if payload.get(field) not in (None, '')]
+    overrides = [field for field in given if field in model_fields]
+    ignored = [field for field in given if field not in model_fields]
+    # A row straight from the store is training-time data, not live traffic,
+    # so only rows with overrides go into the drift monitor
+    return score_company_row(company_row, explain, started,
+                             {"uuid_org": uuid_org, "Overrides": overrides, "Ignored": ignored},
+                             monitor_drift=bool(overrides))
+
+def score_company_row(new_company_row, explain, started, extra=None, monitor_drift=True):
+    try:
+        probabilities = classifier.predict_proba(new_company_row)[0]
+        prediction = int(classifier.classes_[np.argmax(probabilities)])
+        confidence = float(probabilities[1]) * 100
+        if prediction == 0:
+            confidence = 100 - confidence
+        prediction_name = "Closed/No Event" if prediction == 0 else "Funding Round/Acquisition/IPO"
+
+        audit_log.record(new_company_row[0], prediction, confidence, (time.perf_counter() - started) * 1000)
+        if drift_monitor is not None and monitor_drift:
+            drift_monitor.update(new_company_row[0])
+
+        results = {
+            "Prediction": prediction_name,
+            "Confidence": f"{confidence:.2f}"
+        }
+        if extra:
+            results.update(extra)
+
+        if explain:
+            # Per-feature contributions in log-odds; they sum to the model's raw score minus the base value
+            results["Explanation"] = {
+                "base_value": explainer.base_value,
+                "contributions": explainer.explain(new_company_row)[0]
             }
 
-            return jsonify(results)
-
-        except Exception as e:
-            print(f"An error occurred: {e}")
-            return jsonify(error=str(e))
+        return jsonify(results)
 
-    return render_template("index.html")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return jsonify(error=str(e)), 500
 
 @app.route('/search_companies', methods=['GET'])
 @swag_from({
@@ -162,6 +232,12 @@ def predict():
                     }
                 }
             }
+        },
+        400: {
+            'description': 'Bad Request'
+        },
+        503: {
+            'description': 'Company data is not loaded'
         }
     },
     'parameters': [
@@ -169,18 +245,43 @@ def predict():
             'name': 'company_name',
             'in': 'query',
             'type': 'string',
-            'required': True,
+            'required': False,
             'description': 'The name of the company to search for'
+        },
+        {
+            'name': 'categories',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Comma-separated categories to filter on'
+        },
+        {
+            'name': 'category_match',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['all', 'any'],
+            'default': 'all',
+            'required': False,
+            'description': 'Whether companies must match all (AND) or any (OR) of the categories'
         }
     ],
     'tags': ['Company Search']
 })
 def search_companies():
     search_string = request.args.get('company_name', '').lower()
-    if not search_string:
+    categories = split_categories(request.args.get('categories', ''))
+    if not search_string and not categories:
         return render_template('search_companies.html', results=[])
+    if df is None:
+        return jsonify(error="Company data is not loaded"), 503
 
-    filtered_df = df[df['name_org'].str.contains(search_string, case=False, na=False)]
+    category_match = request.args.get('category_match', 'all')
+    if category_match not in CATEGORY_MATCHES:
+        return jsonify(error=f"category_match must be one of {CATEGORY_MATCHES}, got {category_match!r}"), 400
+
+    filtered_df = filter_by_categories(categories, category_match)
+    if search_string:
+        filtered_df = filtered_df[filtered_df['name_org'].str.contains(search_string, case=False, na=False)]
 
     excluded_features = [
         'uuid_org', 'permalink_org', 'domain', 'homepage_url', 
@@ -195,16 +296,215 @@ def search_companies():
 
     return render_template('search_companies.html', results=result) 
 
+def filter_by_categories(categories, match):
+    if not categories:
+        return df
+    return df.iloc[category_index.filter(categories, match)]
+
+@app.route('/search_companies/facets', methods=['GET'])
+@swag_from({
+    'responses': {
+        200: {
+            'description': 'Number of matching companies in each category',
+            'schema': {
+                'type': 'object',
+                'additionalProperties': {'type': 'integer'}
+            }
+        },
+        400: {
+            'description': 'Bad Request'
+        },
+        503: {
+            'description': 'Company data is not loaded'
+        }
+    },
+    'parameters': [
+        {
+            'name': 'categories',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Comma-separated categories to filter on before counting'
+        },
+        {
+            'name': 'category_match',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['all', 'any'],
+            'default': 'all',
+            'required': False,
+            'description': 'Whether companies must match all (AND) or any (OR) of the categories'
+        },
+        {
+            'name': 'top',
+            'in': 'query',
+            'type': 'integer',
+            'minimum': 1,
+            'required': False,
+            'description': 'Only return the largest facets'
+        }
+    ],
+    'tags': ['Company Search']
+})
+def category_facets():
+    if category_index is None:
+        return jsonify(error="Company data is not loaded"), 503
+
+    categories = split_categories(request.args.get('categories', ''))
+    category_match = request.args.get('category_match', 'all')
+    if category_match not in CATEGORY_MATCHES:
+        return jsonify(error=f"category_match must be one of {CATEGORY_MATCHES}, got {category_match!r}"), 400
+    top = request.args.get('top')
+    if top is not None:
+        try:
+            top = int(top)
+        except ValueError:
+            return jsonify(error=f"top must be an integer, got {top!r}"), 400
+        if top < 1:
+            return jsonify(error=f"top must be at least 1, got {top}"), 400
+
+    rows = category_index.filter(categories, category_match) if categories else None
+
+    return jsonify(category_index.facet_counts(rows, top=top))
+
+@app.route('/model/unseen', methods=['GET'])
+@swag_from({
+    'responses': {
+        200: {
+            'description': 'How often this worker has seen categorical values that the model was not trained on',
+            'schema': {
+                'type': 'object',
+                'additionalProperties': {
+                    'type': 'object',
+                    'properties': {
+                        'requests': {'type': 'integer'},
+                        'unseen': {'type': 'integer'},
+                        'unseen_rate': {'type': 'number'},
+                        'training_rare_rate': {'type': 'number'}
+                    }
+                }
+            }
+        }
+    },
+    'tags': ['Model Monitoring']
+})
+def unseen_values():
+    return jsonify({column: encoder.unseen_report() for column, encoder in encoders.items()})
+
+@app.route('/model/audit', methods=['GET'])
+@swag_from({
+    'responses': {
+        200: {
+            'description': 'Audit log counters for this worker',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'recorded': {'type': 'integer'},
+                    'written': {'type': 'integer', 'description': 'Records in closed, readable files'},
+                    'in_open_file': {'type': 'integer', 'description': 'Records in the file being written'},
+                    'pending': {'type': 'integer'},
+                    'dropped': {'type': 'integer'},
+                    'capacity': {'type': 'integer'},
+                    'overflow': {'type': 'string'}
+                }
+            }
+        }
+    },
+    'tags': ['Model Monitoring']
+})
+def audit_stats():
+    return jsonify(audit_log.stats())
+
+@app.route('/model/drift', methods=['GET'])
+@swag_from({
+    'parameters': [
+        {
+            'name': 'scope',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['all', 'worker'],
+            'default': 'all',
+            'description': "'all' merges the states published by every worker, 'worker' only reports the one answering"
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Population stability index (PSI) of every feature against the training data, '
+                           'over the current and the previous window of live requests',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'rows': {'type': 'integer'},
+                    'window_seconds': {'type': 'number'},
+                    'reference_rows': {'type': 'integer'},
+                    'states': {'type': 'integer'},
+                    'drifted_features': {'type': 'array', 'items': {'type': 'string'}},
+                    'features': {
+                        'type': 'object',
+                        'additionalProperties': {
+                            'type': 'object',
+                            'properties': {
+                                'kind': {'type': 'string'},
+                                'psi': {'type': 'number'},
+                                'overflow_rate': {'type': 'number'},
+                                'reference_overflow_rate': {'type': 'number'},
+                                'unseen_rate': {'type': 'number'},
+                                'bins': {'type': 'array', 'items': {'type': 'object'}}
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        404: {
+            'description': 'The model was trained without drift reference histograms'
+        }
+    },
+    'tags': ['Model Monitoring']
+})
+def feature_drift():
+    if drift_monitor is None:
+        return jsonify(error="Drift monitoring is not available, retrain the model to create drift_reference.pkl"), 404
+    return jsonify(drift_monitor.report(include_workers=request.args.get('scope', 'all') != 'worker'))
+
+# Flasgger's default spec, the one /apidocs loads
+API_SPEC_ENDPOINT = 'apispec_1'
+
+def load_openapi_spec():
+    with open(openapi_path) as json_file:
+        return json.load(json_file)
+
+def write_openapi_spec():
+    # Stores the OpenAPI for Scalar
+    spec_builder = swagger or Swagger(app, template=swagger_template)
+    # Build from the routes, never from the prebuilt spec
+    spec_builder.apispecs.pop(API_SPEC_ENDPOINT, None)
+    with app.app_context():
+        spec = spec_builder.get_apispecs(API_SPEC_ENDPOINT)
+    with open(openapi_path, 'w') as json_file:
+        json.dump(spec, json_file, indent=2)
+
+openapi_spec = load_openapi_spec() if fast_start else None
+if swagger is not None and openapi_spec is not None:
+    # Flasgger serves a cached spec instead of building it on the first request
+    swagger.apispecs[API_SPEC_ENDPOINT] = openapi_spec
+
 @app.route('/openapi.json')
 def get_openapi_spec():
-    with open('openapi.json') as json_file:
-        return json.load(json_file)
+    global openapi_spec
+    if openapi_spec is None:
+        openapi_spec = load_openapi_spec()
+    return openapi_spec
 
 def main():
     print("Main function")
     file_path = os.path.join(pkl_path, 'final_model.pkl')
     if not os.path.exists(file_path):
-        if not os.path.exists(os.path.join(data_path, 'unique_filtered_final_with_target_variable.csv')):
+        if os.path.exists(os.path.join(data_path, 'unique_filtered_final_with_target_variable.parquet')):
+            # Larger-than-RAM tables are streamed in chunks and sampled instead of loaded whole
+            print("Training Models out of core and populating pkls folder.")
+            train_model_out_of_core(os.path.join(data_path, 'unique_filtered_final_with_target_variable.parquet'))
+        elif not os.path.exists(os.path.join(data_path, 'unique_filtered_final_with_target_variable.csv')):
             print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
             print(f"CSV named unique_filtered_final_with_target_variable.csv containing CrunchBase Data is missing from csvs folder")
             print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
@@ -218,14 +518,80 @@ def main():
 
 
 
+def train_main(argv):
+    # Retrain even if final_model.pkl exists: python backend/Screening.py train [--tune]
+    parser = argparse.ArgumentParser(prog='Screening.py train', description='Train the model and overwrite the pkls folder.')
+    parser.add_argument('--tune', action='store_true', help='Search hyperparameters with successive halving before the final fit')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel fits during the search (defaults to all cores)')
+    parser.add_argument('--no-compact', action='store_true', help='Serve the full ensemble instead of the early-stopped one')
+    parser.add_argument('--loss-tolerance', type=float, default=DEFAULT_LOSS_TOLERANCE,
+                        help='Relative CV log loss increase allowed when dropping boosting stages')
+    parser.add_argument('--keep-unused-features', action='store_true', help='Keep columns that no tree splits on')
+    args = parser.parse_args(argv)
+
+    options = dict(tune=args.tune, n_jobs=args.jobs, compact=not args.no_compact, loss_tolerance=args.loss_tolerance,
+                   drop_unused_features=not args.keep_unused_features)
+    parquet_path = os.path.join(data_path, 'unique_filtered_final_with_target_variable.parquet')
+    if os.path.exists(parquet_path):
+        train_model_out_of_core(parquet_path, **options)
+    else:
+        data = pd.read_csv(os.path.join(data_path, 'unique_filtered_final_with_target_variable.csv'))
+        train_model(data=data, **options)
+
+def feature_store_main(argv):
+    # Encodes the clean_data() output for /predict/by-id: python backend/Screening.py feature-store [table]
+    from functions.feature_store import build_feature_store
+
+    parquet_path = os.path.join(data_path, 'unique_filtered_final_with_target_variable.parquet')
+    csv_path = os.path.join(data_path, 'unique_filtered_final_with_target_variable.csv')
+
+    parser = argparse.ArgumentParser(prog='Screening.py feature-store', description='Build the uuid_org feature store used by /predict/by-id.')
+    parser.add_argument('source', nargs='?', default=parquet_path if os.path.exists(parquet_path) else csv_path,
+                        help='CSV or Parquet output of clean_data() (defaults to the training table)')
+    parser.add_argument('--output', default=feature_store_path, help='Feature store directory')
+    args = parser.parse_args(argv)
+
+    classifier, encoders, column_names, _ = load_model_artifacts(pkl_path)
+    build_feature_store(args.source, args.output, encoders, column_names,
+                        file_version(os.path.join(pkl_path, 'final_model.pkl')))
+
+def score_main(argv):
+    # Offline scoring job: python backend/Screening.py score <input> <output_dir>
+    from functions.batch_scoring import score_file, DEFAULT_SHARD_BYTES
+
+    parser = argparse.ArgumentParser(prog='Screening.py score', description='Score a CSV or Parquet file of companies.')
+    parser.add_argument('input_path', help='CSV or Parquet file with the cleaned company features')
+    parser.add_argument('output_dir', help='Directory for the sharded Parquet results; re-run with the same directory to resume')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (defaults to the number of cores)')
+    parser.add_argument('--explain', action='store_true', help='Add per-feature contribution columns (shap_<feature>)')
+    parser.add_argument('--shard-mb', type=int, default=DEFAULT_SHARD_BYTES // (1024 * 1024), help='Approximate CSV shard size in MB')
+    args = parser.parse_args(argv)
+
+    score_file(args.input_path, args.output_dir, workers=args.workers, shard_bytes=args.shard_mb * 1024 * 1024,
+               explain=args.explain)
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'train':
+        train_main(sys.argv[2:])
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'feature-store':
+        feature_store_main(sys.argv[2:])
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'score':
+        score_main(sys.argv[2:])
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'openapi':
+        # Build step: prebuild the spec served in fast-start mode
+        write_openapi_spec()
+        sys.exit(0)
+
     main()
 
-    # Stores the OpenAPI for Scalar
-    with app.app_context():
-        openapi_spec = swagger.get_apispecs()
-        with open('openapi.json', 'w') as json_file:
-            json.dump(openapi_spec, json_file, indent=2)
+    write_openapi_spec()
     
     
     print("Starting Flask app")
@@ -0,0 +1,218 @@
+import os
+import time
+import atexit
+import hashlib
+import threading
+import numpy as np
+
+# Non-blocking prediction audit log.
+#
+# record() copies one prediction into a preallocated ring buffer under a lock
+# that is only ever held for a few array assignments, never for I/O. A
+# background thread drains the buffer every flush_interval seconds (or sooner
+# once batch_size records are waiting) and appends them as a row group to the
+# current Parquet file.
+#
+# A Parquet file is only readable once its footer is written on close, so the
+# current file is named *.parquet.inprogress and is closed and renamed to
+# *.parquet every max_file_seconds (or max_rows_per_file rows). A worker that
+# is killed loses at most the last max_file_seconds of records, and
+# stats()['written'] only counts records in closed, readable files.
+#
+# Back-pressure: when the buffer is full, overflow='drop_oldest' overwrites
+# the oldest unwritten record and overflow='drop_newest' discards the new one.
+# Either way the request thread carries on and the loss is counted in
+# stats()['dropped'].
+#
+# The writer thread is started lazily by the first record() of each process,
+# so it also works when gunicorn forks workers from a preloaded master.
+# Files are named audit-<pid>-<time>-<rows written>.parquet so workers never
+# collide. pyarrow is only imported by the writer thread.
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest')
+
+
+def file_version(path):
+    # Short content hash used as the model version in the audit records
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class AuditLog:
+    def __init__(self, directory, feature_names, model_version,
+                 capacity=65536, batch_size=4096, flush_interval=1.0,
+                 max_rows_per_file=1_000_000, max_file_seconds=10.0, overflow='drop_oldest'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+
+        self.directory = directory
+        self.feature_names = list(feature_names)
+        self.model_version = model_version
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_rows_per_file = max_rows_per_file
+        self.max_file_seconds = max_file_seconds
+        self.overflow = overflow
+
+        # Ring buffer columns
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.features = np.zeros((capacity, len(self.feature_names)), dtype=np.float64)
+        self.predictions = np.zeros(capacity, dtype=np.int8)
+        self.confidences = np.zeros(capacity, dtype=np.float64)
+        self.latencies = np.zeros(capacity, dtype=np.float64)
+
+        # head/tail are running counters; slot = counter % capacity
+        self.head = 0
+        self.tail = 0
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+
+        self.lock = threading.Lock()
+        # Serialises file writes between the writer thread and close()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.writer_pid = None
+        self.writer = None
+        self.parquet_writer = None
+        self.file_path = None
+        self.file_opened = 0.0
+        self.file_rows = 0
+        self.schema = None
+
+    def record(self, feature_row, prediction, confidence, latency_ms):
+        if self.writer_pid != os.getpid():
+            self.start_writer()
+
+        with self.lock:
+            if self.head - self.tail >= self.capacity:
+                self.dropped += 1
+                if self.overflow == 'drop_newest':
+                    return
+                self.tail += 1
+            slot = self.head % self.capacity
+            self.timestamps[slot] = time.time()
+            self.features[slot] = feature_row
+            self.predictions[slot] = prediction
+            self.confidences[slot] = confidence
+            self.latencies[slot] = latency_ms
+            self.head += 1
+            self.recorded += 1
+            pending = self.head - self.tail
+
+        if pending >= self.batch_size:
+            self.wakeup.set()
+
+    def start_writer(self):
+        with self.lock:
+            if self.writer_pid == os.getpid():
+                return
+            # After a fork the parent's records and thread belong to the parent
+            self.head = self.tail = self.recorded = self.dropped = self.written = 0
+            self.parquet_writer = None
+            self.writer_pid = os.getpid()
+            self.wakeup = threading.Event()
+            self.writer = threading.Thread(target=self.run_writer, name='audit-log-writer', daemon=True)
+            self.writer.start()
+        atexit.register(self.close)
+
+    def run_writer(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Audit log flush failed: {e}")
+
+    def drain(self):
+        # Copy out everything pending; the lock only covers the memory copies
+        with self.lock:
+            count = self.head - self.tail
+            if count == 0:
+                return None
+            slots = np.arange(self.tail, self.head) % self.capacity
+            batch = (self.timestamps[slots], self.features[slots], self.predictions[slots],
+                     self.confidences[slots], self.latencies[slots])
+            self.tail = self.head
+        return batch
+
+    def flush(self):
+        with self.flush_lock:
+            self.write_batch(self.drain())
+
+    def write_batch(self, batch):
+        if batch is not None:
+            self.append(batch)
+        # Also runs when idle, so a quiet worker still closes its file on time
+        if self.parquet_writer is not None and (self.file_rows >= self.max_rows_per_file or
+                                                time.monotonic() - self.file_opened >= self.max_file_seconds):
+            self.close_file()
+
+    def append(self, batch):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.schema is None:
+            self.schema = pa.schema(
+                [('timestamp', pa.timestamp('us', tz='UTC')),
+                 ('model_version', pa.string()),
+                 ('prediction', pa.int8()),
+                 ('confidence', pa.float64()),
+                 ('latency_ms', pa.float64())]
+                + [(name, pa.float64()) for name in self.feature_names]
+            )
+        timestamps, features, predictions, confidences, latencies = batch
+
+        columns = [
+            pa.array((timestamps * 1e6).astype(np.int64), type=pa.timestamp('us', tz='UTC')),
+            pa.array(np.full(len(timestamps), self.model_version, dtype=object), type=pa.string()),
+            pa.array(predictions),
+            pa.array(confidences),
+            pa.array(latencies),
+        ] + [pa.array(features[:, i]) for i in range(features.shape[1])]
+        table = pa.Table.from_arrays(columns, schema=self.schema)
+
+        if self.parquet_writer is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.file_path = os.path.join(self.directory, f"audit-{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}-{self.written}.parquet")
+            self.parquet_writer = pq.ParquetWriter(self.file_path + '.inprogress', self.schema)
+            self.file_opened = time.monotonic()
+            self.file_rows = 0
+
+        self.parquet_writer.write_table(table)
+        self.file_rows += len(timestamps)
+
+    def close_file(self):
+        # Writes the footer and publishes the file under its final name
+        self.parquet_writer.close()
+        os.replace(self.file_path + '.inprogress', self.file_path)
+        self.written += self.file_rows
+        self.parquet_writer = None
+        self.file_rows = 0
+
+    def close(self):
+        if self.writer_pid != os.getpid():
+            return
+        with self.flush_lock:
+            batch = self.drain()
+            if batch is not None:
+                self.append(batch)
+            if self.parquet_writer is not None:
+                self.close_file()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'recorded': self.recorded,
+                'written': self.written,
+                'in_open_file': self.file_rows,
+                'pending': self.head - self.tail,
+                'dropped': self.dropped,
+                'capacity': self.capacity,
+                'overflow': self.overflow,
+            }
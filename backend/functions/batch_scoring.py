@@ -0,0 +1,223 @@
+import os
+import io
+import csv
+import json
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from functions.models import load_model_artifacts, pkl_path
+from functions.table_io import is_parquet
+from functions.explain import TreeExplainer
+
+# Offline scoring of large company files.
+#
+# The input is split into shards: row groups for Parquet, newline-aligned
+# byte ranges for CSV. A byte range can start inside a quoted field that
+# spans lines, so every CSV shard boundary is moved forward to the next line
+# that parses to the header's number of columns with balanced quotes. Only
+# the ID and model columns are read, and CSV values are read as strings and
+# converted by build_feature_matrix, so a blank or malformed value in any
+# shard becomes 0 like a missing one instead of failing the whole job.
+# Shards are scored in a process pool
+# where every worker loads the model once, and each shard is written to
+# output_dir/part-XXXXX.parquet through a temporary file and an atomic rename.
+# The shard plan is saved to output_dir/_manifest.json, so re-running the same
+# command after a crash only scores the shards that have no output yet.
+# pyarrow is imported by the functions that read or write Parquet.
+
+DEFAULT_SHARD_BYTES = 64 * 1024 * 1024
+ID_COLUMNS = ['uuid_org', 'name_org']
+PREDICTION_NAMES = np.array(["Closed/No Event", "Funding Round/Acquisition/IPO"], dtype=object)
+
+# Per-process model, set by init_worker
+worker_state = {}
+
+
+def csv_fields(line):
+    return next(csv.reader([line.decode('utf-8', errors='replace')]), [])
+
+
+def starts_a_record(line, num_columns):
+    # A line inside a quoted multi-line field rarely has the header's column
+    # count and balanced quotes at the same time
+    return line.count(b'"') % 2 == 0 and len(csv_fields(line)) == num_columns
+
+
+def plan_csv_shards(input_path, shard_bytes):
+    size = os.path.getsize(input_path)
+    with open(input_path, 'rb') as file:
+        header = file.readline()
+        num_columns = len(csv_fields(header))
+        boundaries = [len(header)]
+        position = len(header) + shard_bytes
+        while position < size:
+            # Move every boundary to the start of the next line
+            file.seek(position)
+            file.readline()
+            position = file.tell()
+            if position >= size:
+                break
+            # Skip the rest of a quoted field that spans lines
+            while position < size and not starts_a_record(file.readline(), num_columns):
+                position = file.tell()
+            if position >= size:
+                break
+            boundaries.append(position)
+            position += shard_bytes
+    boundaries.append(size)
+    return [{'start': start, 'end': end} for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+
+def plan_parquet_shards(input_path):
+    import pyarrow.parquet as pq
+    return [{'row_group': i} for i in range(pq.ParquetFile(input_path).num_row_groups)]
+
+
+def plan_shards(input_path, shard_bytes=DEFAULT_SHARD_BYTES):
+    if is_parquet(input_path):
+        return plan_parquet_shards(input_path)
+    return plan_csv_shards(input_path, shard_bytes)
+
+
+def read_shard(input_path, shard, columns=None):
+    # columns limits the read to the ones scoring needs; absent ones are skipped
+    wanted = None if columns is None else set(columns)
+    if 'row_group' in shard:
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(input_path)
+        if wanted is not None:
+            columns = [column for column in parquet_file.schema_arrow.names if column in wanted]
+        return parquet_file.read_row_group(shard['row_group'], columns=columns).to_pandas()
+
+    with open(input_path, 'rb') as file:
+        header = file.readline()
+        file.seek(shard['start'])
+        body = file.read(shard['end'] - shard['start'])
+    usecols = None if wanted is None else (lambda column: column in wanted)
+    return pd.read_csv(io.BytesIO(header + body), dtype=str, usecols=usecols)
+
+
+def init_worker(model_path, explain=False):
+    classifier, encoders, column_names, _ = load_model_artifacts(model_path)
+    # Matrices are built in column_names order, so skip the feature name check
+    classifier.__dict__.pop('feature_names_in_', None)
+    worker_state['classifier'] = classifier
+    worker_state['encoders'] = encoders
+    worker_state['column_names'] = column_names
+    worker_state['explainer'] = TreeExplainer(classifier, column_names) if explain else None
+
+
+def numeric_values(values):
+    # CSV shards are read as strings, with booleans written as True/False
+    if pd.api.types.is_bool_dtype(values):
+        values = values.astype('Float64')
+    elif not pd.api.types.is_numeric_dtype(values):
+        lowered = values.str.lower()
+        values = values.mask(lowered == 'true', '1').mask(lowered == 'false', '0')
+    return pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+
+
+def build_feature_matrix(companies, encoders, column_names):
+    # Same layout as /predict: model column order, absent columns filled with 0
+    X = np.zeros((len(companies), len(column_names)), dtype=np.float64)
+    for i, column in enumerate(column_names):
+        if column not in companies.columns:
+            continue
+        if column in encoders:
+            X[:, i] = encoders[column].transform(companies[column].astype(str))
+        else:
+            X[:, i] = numeric_values(companies[column])
+    return X
+
+
+def score_frame(companies, classifier, encoders, column_names, explainer=None):
+    X = build_feature_matrix(companies, encoders, column_names)
+    probabilities = classifier.predict_proba(X)
+    predictions = classifier.classes_[np.argmax(probabilities, axis=1)].astype(np.int64)
+    confidence = np.where(predictions == 1, probabilities[:, 1], probabilities[:, 0]) * 100
+
+    scores = companies[[column for column in ID_COLUMNS if column in companies.columns]].reset_index(drop=True)
+    scores['prediction'] = predictions
+    scores['prediction_name'] = PREDICTION_NAMES[predictions]
+    scores['confidence'] = confidence
+
+    if explainer is not None:
+        # Log-odds contributions: shap_base_value + sum(shap_*) is the raw score
+        contributions = explainer.shap_values(X)
+        scores['shap_base_value'] = explainer.base_value
+        for i, column in enumerate(column_names):
+            scores[f'shap_{column}'] = contributions[:, i]
+    return scores
+
+
+def shard_output_path(output_dir, shard_id):
+    return os.path.join(output_dir, f"part-{shard_id:05d}.parquet")
+
+
+def score_shard(input_path, output_dir, shard_id, shard):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    started = time.time()
+    companies = read_shard(input_path, shard, ID_COLUMNS + worker_state['column_names'])
+    scores = score_frame(companies, worker_state['classifier'], worker_state['encoders'], worker_state['column_names'],
+                         worker_state['explainer'])
+
+    output_path = shard_output_path(output_dir, shard_id)
+    temporary_path = output_path + '.tmp'
+    pq.write_table(pa.Table.from_pandas(scores, preserve_index=False), temporary_path)
+    os.replace(temporary_path, output_path)
+
+    return shard_id, len(scores), time.time() - started
+
+
+def load_or_create_manifest(input_path, output_dir, shard_bytes, explain=False):
+    manifest_path = os.path.join(output_dir, '_manifest.json')
+    stat = os.stat(input_path)
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+        if manifest['input_path'] == os.path.abspath(input_path) and manifest['input_size'] == stat.st_size \
+                and manifest['input_mtime'] == stat.st_mtime and manifest.get('explain', False) == explain:
+            return manifest
+        raise ValueError(f"{output_dir} holds results for a different input or options; use an empty output directory")
+
+    manifest = {
+        'input_path': os.path.abspath(input_path),
+        'input_size': stat.st_size,
+        'input_mtime': stat.st_mtime,
+        'explain': explain,
+        'shards': plan_shards(input_path, shard_bytes),
+    }
+    with open(manifest_path + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+
+def score_file(input_path, output_dir, workers=None, shard_bytes=DEFAULT_SHARD_BYTES, model_path=pkl_path, explain=False):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_or_create_manifest(input_path, output_dir, shard_bytes, explain)
+
+    pending = [(shard_id, shard) for shard_id, shard in enumerate(manifest['shards'])
+               if not os.path.exists(shard_output_path(output_dir, shard_id))]
+    print(f"{len(manifest['shards'])} shards, {len(manifest['shards']) - len(pending)} already scored, {len(pending)} to go")
+    if not pending:
+        return
+
+    workers = workers or os.cpu_count()
+    started = time.time()
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=init_worker, initargs=(model_path, explain)) as pool:
+        futures = [pool.submit(score_shard, input_path, output_dir, shard_id, shard)
+                   for shard_id, shard in pending]
+        for future in as_completed(futures):
+            shard_id, rows, seconds = future.result()
+            total_rows += rows
+            print(f"Scored shard {shard_id} ({rows} rows) in {seconds:.1f}s")
+
+    elapsed = time.time() - started
+    print(f"Scored {total_rows} rows in {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9):.0f} rows/s)")
@@ -0,0 +1,108 @@
+import zlib
+import threading
+import numpy as np
+import pandas as pd
+
+# Frequency-aware encoding for the categorical features.
+#
+# Values seen at least `min_count` times in training get their own code
+# (0..n_classes-1, sorted like LabelEncoder). Rare training values and values
+# never seen in training are hashed with crc32 into a fixed range of overflow
+# buckets (n_classes..n_classes+num_buckets-1). crc32 is stable across
+# processes, unlike hash(), so every gunicorn worker gives the same code to
+# the same value, and nothing is ever added to the encoder at serving time.
+#
+# encode() counts requests and unseen values for unseen_report(). The counts
+# are per process and guarded by a lock, since the development server handles
+# requests in threads.
+
+DEFAULT_MIN_COUNT = 5
+DEFAULT_NUM_BUCKETS = 32
+
+
+def bucket_for(value, num_buckets):
+    return zlib.crc32(str(value).encode('utf-8')) % num_buckets
+
+
+class FrequencyAwareEncoder:
+    def __init__(self, min_count=DEFAULT_MIN_COUNT, num_buckets=DEFAULT_NUM_BUCKETS):
+        self.min_count = min_count
+        self.num_buckets = num_buckets
+        self.count_lock = threading.Lock()
+        self.reset_counts()
+
+    def fit(self, values):
+        return self.fit_counts(pd.Series(values).astype(str).value_counts())
+
+    def fit_counts(self, counts):
+        # Fit from precomputed value counts, e.g. accumulated over chunks
+        self.classes_ = np.array(sorted(counts[counts >= self.min_count].index), dtype=object)
+        self.rare_fraction_ = float(counts[counts < self.min_count].sum() / max(counts.sum(), 1))
+        self.table = {value: code for code, value in enumerate(self.classes_)}
+        return self
+
+    def transform(self, values):
+        values = pd.Series(values).astype(str)
+        codes = values.map(self.table)
+        unmatched = codes.isna()
+        if unmatched.any():
+            codes[unmatched] = values[unmatched].map(self.overflow_code)
+        return codes.astype(np.int64).to_numpy()
+
+    def fit_transform(self, values):
+        return self.fit(values).transform(values)
+
+    def overflow_code(self, value):
+        return len(self.classes_) + bucket_for(value, self.num_buckets)
+
+    def encode(self, value):
+        # Request path: one dict lookup, or a crc32 for unseen values
+        code = self.table.get(value)
+        with self.count_lock:
+            self.seen_count += 1
+            if code is None:
+                self.unseen_count += 1
+        if code is None:
+            code = self.overflow_code(value)
+        return code
+
+    @property
+    def num_codes(self):
+        return len(self.classes_) + self.num_buckets
+
+    def reset_counts(self):
+        with self.count_lock:
+            self.seen_count = 0
+            self.unseen_count = 0
+
+    def unseen_report(self):
+        with self.count_lock:
+            seen_count, unseen_count = self.seen_count, self.unseen_count
+        return {
+            'requests': seen_count,
+            'unseen': unseen_count,
+            'unseen_rate': unseen_count / seen_count if seen_count else 0.0,
+            'training_rare_rate': self.rare_fraction_,
+        }
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('count_lock', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Serving counters are per process and start from zero after loading
+        self.count_lock = threading.Lock()
+        self.reset_counts()
+
+    @classmethod
+    def from_label_encoder(cls, label_encoder, num_buckets=DEFAULT_NUM_BUCKETS):
+        # Wraps a LabelEncoder pickled before frequency-aware encoding existed.
+        # Its model never saw the overflow codes, but they are still bounded
+        # and identical across workers.
+        encoder = cls(min_count=1, num_buckets=num_buckets)
+        encoder.classes_ = np.asarray(label_encoder.classes_, dtype=object)
+        encoder.rare_fraction_ = 0.0
+        encoder.table = {value: code for code, value in enumerate(encoder.classes_)}
+        return encoder
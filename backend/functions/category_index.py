@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+# Inverted index over the comma-separated 'category_list' column.
+#
+# Every individual category maps to a sorted int32 array of the row positions
+# (postings) that contain it, so AND/OR filters become sorted-array
+# intersections/unions instead of substring scans over the string column.
+# A flat (row, category) pair list is also kept so facet counts for any
+# selection can be computed with a single np.bincount.
+#
+# Categories are matched case-insensitively. Facets are keyed by each
+# category's most common spelling in the data, so 'SaaS' stays 'SaaS'.
+
+CATEGORY_MATCHES = ('all', 'any')
+
+
+class CategoryIndex:
+    def __init__(self, categories, postings, entry_rows, entry_categories, num_rows):
+        self.categories = categories
+        self.category_ids = {name.lower(): i for i, name in enumerate(categories)}
+        self.postings = postings
+        self.entry_rows = entry_rows
+        self.entry_categories = entry_categories
+        self.num_rows = num_rows
+
+    def rows_for(self, category):
+        category_id = self.category_ids.get(category.strip().lower())
+        if category_id is None:
+            return np.empty(0, dtype=np.int32)
+        return self.postings[category_id]
+
+    def filter(self, categories, match='all'):
+        # Returns the sorted row positions matching the categories.
+        # match='all' -> rows containing every category (AND)
+        # match='any' -> rows containing at least one category (OR)
+        if not categories:
+            return np.arange(self.num_rows, dtype=np.int32)
+
+        postings = [self.rows_for(category) for category in categories]
+
+        if match == 'all':
+            # Intersect smallest first so the working set shrinks quickly
+            postings.sort(key=len)
+            rows = postings[0]
+            for posting in postings[1:]:
+                if rows.size == 0:
+                    break
+                rows = np.intersect1d(rows, posting, assume_unique=True)
+            return rows
+        elif match == 'any':
+            mask = np.zeros(self.num_rows, dtype=bool)
+            for posting in postings:
+                mask[posting] = True
+            return np.flatnonzero(mask).astype(np.int32)
+        else:
+            raise ValueError(f"category_match must be one of {CATEGORY_MATCHES}, got {match!r}")
+
+    def facet_counts(self, rows=None, top=None):
+        # Number of selected rows carrying each category, largest first
+        if rows is None:
+            counts = np.bincount(self.entry_categories, minlength=len(self.categories))
+        else:
+            selected = np.zeros(self.num_rows, dtype=bool)
+            selected[rows] = True
+            counts = np.bincount(self.entry_categories[selected[self.entry_rows]],
+                                 minlength=len(self.categories))
+
+        order = np.argsort(-counts, kind='stable')
+        order = order[counts[order] > 0]
+        if top is not None:
+            order = order[:top]
+        return {self.categories[i]: int(counts[i]) for i in order}
+
+
+def split_categories(category_list):
+    if pd.isnull(category_list):
+        return []
+    return [category.strip() for category in str(category_list).split(',') if category.strip()]
+
+
+def build_category_index(df, column='category_list'):
+    # Explode the column once into (row, category) pairs
+    tokens = df[column].map(split_categories)
+    lengths = tokens.map(len).to_numpy()
+    entry_rows = np.repeat(np.arange(len(df), dtype=np.int32), lengths)
+    flat_tokens = [category for row_categories in tokens for category in row_categories]
+
+    codes, categories = pd.factorize(pd.Series([category.lower() for category in flat_tokens], dtype=object), sort=True)
+    entry_categories = codes.astype(np.int32)
+
+    # Display label: the most common spelling of each category, then the first alphabetically
+    spellings = pd.DataFrame({'code': codes, 'label': pd.Series(flat_tokens, dtype=object)})
+    spellings = spellings.groupby(['code', 'label']).size().reset_index(name='count')
+    spellings = spellings.sort_values(['code', 'count', 'label'], ascending=[True, False, True]).drop_duplicates('code')
+    labels = spellings['label'].tolist()
+
+    # A category listed twice for the same company should only count once
+    pairs = np.unique(entry_rows.astype(np.int64) * len(categories) + entry_categories) if len(categories) else np.empty(0, dtype=np.int64)
+    entry_rows = (pairs // max(len(categories), 1)).astype(np.int32)
+    entry_categories = (pairs % max(len(categories), 1)).astype(np.int32)
+
+    # Group the pairs by category to build the sorted postings lists
+    order = np.argsort(entry_categories, kind='stable')
+    boundaries = np.searchsorted(entry_categories[order], np.arange(len(categories) + 1))
+    sorted_rows = entry_rows[order]
+    postings = [sorted_rows[boundaries[i]:boundaries[i + 1]] for i in range(len(categories))]
+
+    return CategoryIndex(labels, postings, entry_rows, entry_categories, len(df))
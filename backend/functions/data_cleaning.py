@@ -4,6 +4,8 @@ import math
 import re
 import logging
 
+from functions.table_io import read_matching_rows
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -22,14 +24,53 @@ logger = logging.getLogger(__name__)
 - event_appearances.csv
 """
 
+# Default warmup (feature) and simulation (outcome) windows.
+# Each window lasts WINDOW_YEARS, so the defaults are 2015-2018 and 2019-2022.
+DEFAULT_START_DATE = datetime(2015, 1, 1) # Start Day: 1 of January of 2015
+DEFAULT_SIM_START_DATE = datetime(2019, 1, 1) # Start Day: 1 of January of 2019
+
+WINDOW_YEARS = 4
+
+# Columns of organizations.csv that are never used
+organization_columns_to_drop = ['type', 
+    'cb_url', 
+    'rank', 
+    'created_at', 
+    'updated_at', 
+    'legal_name', 
+    'roles', 
+    'cb_url', 
+    'rank', 
+    'created_at', 
+    'updated_at', 
+    'legal_name', 
+    'roles', 
+    'email', 
+    'phone', 
+    'logo_url', 
+    'alias1', 
+    'alias2', 
+    'alias3', 
+    'primary_role', 
+    'num_exits']
+
+def resolve_warmup_window(start_date, end_date):
+    # Only fill in the dates the caller left out
+    start_date = pd.Timestamp(start_date) if start_date else pd.Timestamp(DEFAULT_START_DATE)
+    end_date = pd.Timestamp(end_date) if end_date else start_date + pd.DateOffset(years=WINDOW_YEARS) - pd.Timedelta(days=1)
+    return start_date, end_date
+
+def resolve_simulation_window(sim_start_date, sim_end_date):
+    sim_start_date = pd.Timestamp(sim_start_date) if sim_start_date else pd.Timestamp(DEFAULT_SIM_START_DATE)
+    sim_end_date = pd.Timestamp(sim_end_date) if sim_end_date else sim_start_date + pd.DateOffset(years=WINDOW_YEARS) - pd.Timedelta(days=1)
+    return sim_start_date, sim_end_date
+
 def clean_organization_csv(organization_path,
                            start_date,
                            end_date):
     org_df = pd.read_csv(organization_path)
 
-    if not start_date or end_date:
-        start_date = datetime.strptime('2015-01-01', '%Y-%m-%d') # Start Day: 1 of January of 2015
-        end_date = datetime.strptime('2018-12-31', '%Y-%m-%d') # End Day: 31 of December of 2018
+    start_date, end_date = resolve_warmup_window(start_date, end_date)
 
     # Convert 'founded_on' to datetime
     org_df['founded_on'] = pd.to_datetime(org_df['founded_on'], errors='coerce')
@@ -40,31 +81,8 @@ def clean_organization_csv(organization_path,
     # Filter the dataframe where 'domain' is 'company'
     org_df = org_df[org_df['domain'] == 'company']
 
-    # Specify the columns to drop
-    columns_to_drop = ['type', 
-        'cb_url', 
-        'rank', 
-        'created_at', 
-        'updated_at', 
-        'legal_name', 
-        'roles', 
-        'cb_url', 
-        'rank', 
-        'created_at', 
-        'updated_at', 
-        'legal_name', 
-        'roles', 
-        'email', 
-        'phone', 
-        'logo_url', 
-        'alias1', 
-        'alias2', 
-        'alias3', 
-        'primary_role', 
-        'num_exits']
-
     # Drop the specified columns
-    org_df = org_df.drop(columns=columns_to_drop)
+    org_df = org_df.drop(columns=organization_columns_to_drop)
 
     return org_df
 
@@ -74,12 +92,10 @@ def clean_funding_information_csv(org_df,
                                   start_date,
                                   end_date):
     
-    if not start_date or end_date:
-        start_date = datetime.strptime('2015-01-01', '%Y-%m-%d') # Start Day: 1 of January of 2015
-        end_date = datetime.strptime('2018-12-31', '%Y-%m-%d') # End Day: 31 of December of 2018
+    start_date, end_date = resolve_warmup_window(start_date, end_date)
 
     # Grab the funding data: (IPO/Acquisition/Closure)
-    fund_df = pd.read_csv(funding_path)
+    fund_df = read_matching_rows(funding_path, 'org_uuid', org_df['uuid'])
 
     # Merge the two dataframes
     merged_df = org_df.merge(fund_df, left_on='uuid', right_on='org_uuid', how="left")
@@ -89,7 +105,7 @@ def clean_funding_information_csv(org_df,
     filtered_close_merged_df = merged_df[(merged_df['closed_on'] < start_date) | (merged_df['closed_on'] > end_date) | (merged_df['closed_on'].isna())]
 
     # Remove ones acquired during warmup window
-    ac_df = pd.read_csv(acquisitions_path)
+    ac_df = read_matching_rows(acquisitions_path, 'acquiree_uuid', org_df['uuid'])
     ac_df =  filtered_close_merged_df.merge(ac_df, left_on='uuid_x', right_on='acquiree_uuid', how="left")
 
     ac_df['acquired_on'] = pd.to_datetime(ac_df['acquired_on'])
@@ -104,12 +120,8 @@ def clean_ipos_csv(ipos_path,
                    sim_start_date,
                    sim_end_date):
     
-    if not start_date or end_date:
-        start_date = datetime.strptime('2015-01-01', '%Y-%m-%d') # Start Day: 1 of January of 2015
-        end_date = datetime.strptime('2018-12-31', '%Y-%m-%d') # End Day: 31 of December of 2018
-    if not sim_start_date or sim_end_date:
-        sim_start_date = datetime.strptime('2019-01-01', '%Y-%m-%d') # Start Day: 1 of January of 2019
-        sim_end_date = datetime.strptime('2022-12-31', '%Y-%m-%d') # End Day: 31 of December of 2022
+    start_date, end_date = resolve_warmup_window(start_date, end_date)
+    sim_start_date, sim_end_date = resolve_simulation_window(sim_start_date, sim_end_date)
 
 
     # Remove ones that IPO'd during warmup window
@@ -145,15 +157,10 @@ def clean_ipos_csv(ipos_path,
     unique_filtered.rename(columns={'region_x': 'region'}, inplace=True)
     unique_filtered.rename(columns={'city_x': 'city'}, inplace=True)
 
-    # Filtering on date
-    if not sim_start_date or sim_end_date:
-        simulation_start_date = datetime.strptime('2019-01-01', '%Y-%m-%d') # Start Day: 1 of January of 2019
-        simulation_end_date = datetime.strptime('2022-12-31', '%Y-%m-%d') # End Day: 31 of December of 2022
-
     unique_filtered['founded_on'] = pd.to_datetime(unique_filtered['founded_on'])
 
     unique_filtered['age_months'] = unique_filtered['founded_on'].apply(
-        lambda x: math.ceil((simulation_start_date - x).days / 30) if pd.notnull(x) else float('nan')
+        lambda x: math.ceil((sim_start_date - x).days / 30) if pd.notnull(x) else float('nan')
     )
     # Convert URLs into binary variables
     unique_filtered['has_facebook_url'] = unique_filtered['facebook_url'].apply(has_url)
@@ -167,22 +174,20 @@ def clean_funding_rounds_csv(funding_rounds_path,
                              unique_filtered
                             ):
     
-    if not sim_start_date:
-        sim_start_date = datetime.strptime('2019-01-01', '%Y-%m-%d') # Start Day: 1 of January of 2019
+    sim_start_date, _ = resolve_simulation_window(sim_start_date, None)
 
 
-    funding_rounds_data = pd.read_csv(funding_rounds_path)
+    # Only the rounds of the companies still in unique_filtered are read
+    funding_rounds = read_matching_rows(funding_rounds_path, 'org_uuid', unique_filtered['uuid_org'])
 
     # Convert relevant date columns to datetime format
     unique_filtered['founded_on'] = pd.to_datetime(unique_filtered['founded_on'])
     unique_filtered['last_funding_on'] = pd.to_datetime(unique_filtered['last_funding_on'])
 
-    funding_rounds = funding_rounds_data[funding_rounds_data['org_uuid'].isin(unique_filtered['uuid_org'])]
-
     funding_rounds['announced_on'] = pd.to_datetime(funding_rounds['announced_on'])
 
-    # Set the simulation start date (ts) to January 1, 2019
-    ts = pd.to_datetime('2019-01-01')
+    # The simulation start date (ts) splits warmup history from outcomes
+    ts = pd.to_datetime(sim_start_date)
 
     # 3. Filter the funding rounds that occurred before ts
     funding_before_ts = funding_rounds[funding_rounds['announced_on'] < ts]
@@ -234,10 +239,8 @@ def clean_investments_csv(investments_path,
                         funding_before_ts):
     # Number of (unique) investors who participated in funding rounds during warmup
 
-    invst_df = pd.read_csv(investments_path)
-
-    # 1. Filter the investments that occurred during the Warmup window
-    investments_warmup = invst_df[invst_df['funding_round_uuid'].isin(funding_before_ts['uuid'])]
+    # 1. Read only the investments in funding rounds from the Warmup window
+    investments_warmup = read_matching_rows(investments_path, 'funding_round_uuid', funding_before_ts['uuid'])
 
     # 2. Calculate the number of unique investors for each company during the Warmup window
     investor_count = investments_warmup.groupby('funding_round_uuid')['investor_uuid'].nunique().rename('investor_count')
@@ -279,8 +282,8 @@ def clean_people_and_degrees_csv(people_path,
     
     # Founders Data:
 
-    ppl_df = pd.read_csv(people_path)
-    people = ppl_df[ppl_df['featured_job_organization_uuid'].isin(unique_filtered['uuid_org'])]
+    # Only people whose featured job is at one of the companies are read
+    people = read_matching_rows(people_path, 'featured_job_organization_uuid', unique_filtered['uuid_org'])
 
     # Step 2: Define the regex pattern
     pattern = r'\b(cofounder|founder|ceo|cto|cmo|cpo|chief executive|chief technology|chief operation)\b'
@@ -312,7 +315,8 @@ def clean_people_and_degrees_csv(people_path,
     
     # Look at education history
 
-    degree_df = pd.read_csv(degrees_path)
+    # Only the degrees of the founders found above are read
+    degree_df = read_matching_rows(degrees_path, 'person_uuid', filtered_people_data['uuid'])
 
     # Step 4: Merge the degrees data with the filtered people data
     merged_degrees = degree_df.merge(filtered_people_data, left_on='person_uuid', right_on='uuid', how='inner')
@@ -355,9 +359,7 @@ def define_acquired(ac_df,
     # Filter for companies acquired during the simulation window
     
     # Filtering on date
-    if not sim_start_date or sim_end_date:
-        sim_start_date = datetime.strptime('2019-01-01', '%Y-%m-%d') # Start Day: 1 of January of 2019
-        sim_end_date = datetime.strptime('2022-12-31', '%Y-%m-%d') # End Day: 31 of December of 2022
+    sim_start_date, sim_end_date = resolve_simulation_window(sim_start_date, sim_end_date)
 
     
     acquired_during_simulation = merged_data[
@@ -378,9 +380,7 @@ def define_ipo(ipo_df,
                sim_start_date,
                sim_end_date):
     
-    if not sim_start_date or sim_end_date:
-        sim_start_date = datetime.strptime('2019-01-01', '%Y-%m-%d') # Start Day: 1 of January of 2019
-        sim_end_date = datetime.strptime('2022-12-31', '%Y-%m-%d') # End Day: 31 of December of 2022
+    sim_start_date, sim_end_date = resolve_simulation_window(sim_start_date, sim_end_date)
 
 
     # Convert 'went_public_on' column to datetime
@@ -406,9 +406,7 @@ def define_fr(fund_df,
               ipo_during_simulation,
               acquired_during_simulation):
     
-    if not sim_start_date or sim_end_date:
-        sim_start_date = datetime.strptime('2019-01-01', '%Y-%m-%d') # Start Day: 1 of January of 2019
-        sim_end_date = datetime.strptime('2022-12-31', '%Y-%m-%d') # End Day: 31 of December of 2022
+    sim_start_date, sim_end_date = resolve_simulation_window(sim_start_date, sim_end_date)
 
     # Convert 'announced_on' column to datetime
     fund_df['announced_on'] = pd.to_datetime(fund_df['announced_on'], errors='coerce')
@@ -437,9 +435,7 @@ def define_cl(org_df,
               sim_start_date,
               sim_end_date):
     
-    if not sim_start_date or sim_end_date:
-        sim_start_date = datetime.strptime('2019-01-01', '%Y-%m-%d') # Start Day: 1 of January of 2019
-        sim_end_date = datetime.strptime('2022-12-31', '%Y-%m-%d') # End Day: 31 of December of 2022
+    sim_start_date, sim_end_date = resolve_simulation_window(sim_start_date, sim_end_date)
 
     # Convert 'closed_on' column to datetime
     org_df['closed_on'] = pd.to_datetime(org_df['closed_on'], errors='coerce')
@@ -458,6 +454,8 @@ def define_cl(org_df,
     # Update 'outcome' column for closed companies
     org_df.loc[org_df['uuid_org'].isin(closed_during_simulation['uuid_org']), 'outcome'] = 'CL'
 
+    return org_df
+
 def clean_data(organization_path, 
                funding_rounds_path,
                acquisitions_path,
@@ -509,7 +507,7 @@ def clean_data(organization_path,
 
     # Filtering people.csv and degrees.csv
     logger.info("Cleaning people.csv and degrees.csv")
-    unqiue_filtered = clean_people_and_degrees_csv( people_path,
+    unique_filtered = clean_people_and_degrees_csv( people_path,
                                                     degrees_path,
                                                     unique_filtered)
 
@@ -518,9 +516,9 @@ def clean_data(organization_path,
     
     logger.info("Defining targets")
     org_df = unique_filtered
-    ac_df = pd.read_csv(acquisitions_path)
-    ipo_df = pd.read_csv(ipos_path)
-    fund_df = pd.read_csv(funding_rounds_path)
+    ac_df = read_matching_rows(acquisitions_path, 'acquiree_uuid', org_df['uuid_org'])
+    ipo_df = read_matching_rows(ipos_path, 'org_uuid', org_df['uuid_org'])
+    fund_df = read_matching_rows(funding_rounds_path, 'org_uuid', org_df['uuid_org'])
 
 
     ### DEFINING ACQUIRED (AC) ###
@@ -0,0 +1,340 @@
+import os
+import glob
+import time
+import uuid
+import atexit
+import threading
+import numpy as np
+
+# Streaming feature-drift monitor for the serving workers.
+#
+# train_model() saves a reference histogram for every feature in column_names:
+#   - numeric features get fixed bins cut at the training quantiles, plus a
+#     last bin for missing (NaN) values
+#   - categorical features get one bin for each of the top_k most common
+#     training codes, one "other" bin for the remaining known codes and one
+#     "overflow" bin for the codes that rare and unseen values hash into
+#
+# Each worker keeps a DriftMonitor whose update() bins one encoded request row
+# into a flat count array: a handful of numpy calls writing into buffers
+# allocated at startup, with exactly one increment per feature. The reference
+# and update() share bin_numeric(), so a value always lands in the same bin.
+#
+# Counts are kept in tumbling windows of window seconds and a report covers
+# the current and the previous window, so it follows the recent traffic
+# rather than everything since startup. Counts are plain sums, so the states
+# of several workers merge by adding them up.
+#
+# When a directory is given, every worker publishes its state there from a
+# background thread as drift-<model version>-<boot id>-<pid>.npz and report()
+# merges the files of the same model and server start (gunicorn.conf.py sets
+# SCREENING_BOOT_ID once in the master). A worker removes its file on exit,
+# and files not refreshed for STALE_PUBLISH_INTERVALS publish intervals (a
+# killed worker) are ignored and deleted.
+#
+# PSI per feature is sum((live - ref) * ln(live / ref)) over its bins. As a
+# rule of thumb, under 0.1 is stable and over 0.25 is a significant shift.
+
+DEFAULT_NUM_BINS = 10
+DEFAULT_TOP_K = 20
+DEFAULT_WINDOW_SECONDS = 3600
+STALE_PUBLISH_INTERVALS = 3
+PSI_EPSILON = 1e-4
+PSI_ALERT = 0.25
+
+BOOT_ID = os.environ.get('SCREENING_BOOT_ID') or uuid.uuid4().hex[:12]
+
+
+def bin_numeric(values, edges, missing_bins, out=None, comparisons=None, missing=None):
+    # Bin of every value: the number of edges below it, or missing_bins for
+    # NaN. edges has one row per value (or a single row) padded with +inf; the
+    # optional buffers let update() run without allocating.
+    comparisons = np.greater(values[:, None], edges, out=comparisons)
+    out = np.add.reduce(comparisons, axis=1, out=out)
+    missing = np.isnan(values, out=missing)
+    np.copyto(out, missing_bins, where=missing)
+    return out
+
+
+def build_drift_reference(X, encoders, num_bins=DEFAULT_NUM_BINS, top_k=DEFAULT_TOP_K):
+    # X: encoded training features (DataFrame in column_names order)
+    features = []
+    for column in X.columns:
+        values = X[column].to_numpy(dtype=np.float64)
+
+        if column in encoders:
+            encoder = encoders[column]
+            num_classes = len(encoder.classes_)
+            codes = np.clip(values.astype(np.int64), 0, encoder.num_codes - 1)
+            code_counts = np.bincount(codes, minlength=encoder.num_codes)
+
+            top = np.argsort(-code_counts[:num_classes], kind='stable')[:top_k]
+            top = top[code_counts[top] > 0]
+            # code -> bin: top codes first, then "other", then "overflow"
+            lookup = np.full(encoder.num_codes, len(top), dtype=np.int64)
+            lookup[top] = np.arange(len(top))
+            lookup[num_classes:] = len(top) + 1
+
+            counts = np.bincount(lookup[codes], minlength=len(top) + 2)
+            labels = [str(encoder.classes_[code]) for code in top] + ['(other)', '(rare or unseen)']
+            features.append({'name': column, 'kind': 'categorical', 'lookup': lookup,
+                             'labels': labels, 'counts': counts})
+        else:
+            finite = values[np.isfinite(values)]
+            quantiles = np.linspace(0, 1, num_bins + 1)[1:-1]
+            edges = np.unique(np.quantile(finite, quantiles)) if len(finite) else np.zeros(1)
+            counts = np.bincount(bin_numeric(values, edges[None, :], len(edges) + 1), minlength=len(edges) + 2)
+            labels = ([f"<= {edges[0]:g}"] + [f"({low:g}, {high:g}]" for low, high in zip(edges[:-1], edges[1:])]
+                      + [f"> {edges[-1]:g}", '(missing)'])
+            features.append({'name': column, 'kind': 'numeric', 'edges': edges,
+                             'labels': labels, 'counts': counts})
+
+    return {'features': features, 'rows': len(X)}
+
+
+def population_stability_index(live_counts, reference_counts):
+    live = np.maximum(live_counts / max(live_counts.sum(), 1), PSI_EPSILON)
+    reference = np.maximum(reference_counts / max(reference_counts.sum(), 1), PSI_EPSILON)
+    return float(np.sum((live - reference) * np.log(live / reference)))
+
+
+class DriftMonitor:
+    def __init__(self, reference, column_names, encoders=None, directory=None, publish_interval=30.0,
+                 window=DEFAULT_WINDOW_SECONDS, model_version='', boot_id=BOOT_ID):
+        self.reference = reference
+        self.encoders = encoders or {}
+        self.directory = directory
+        self.publish_interval = publish_interval
+        self.window = window
+        self.state_prefix = f"drift-{model_version}-{boot_id}-"
+
+        positions = {name: i for i, name in enumerate(column_names)}
+        features = [self.with_missing_bin(feature) for feature in reference['features']]
+        numeric = [feature for feature in features if feature['kind'] == 'numeric']
+        categorical = [feature for feature in features if feature['kind'] == 'categorical']
+        # Numeric bins come first in the flat bin buffer, categorical after
+        self.features = numeric + categorical
+        self.categorical_names = [feature['name'] for feature in categorical]
+
+        sizes = np.array([len(feature['counts']) for feature in self.features], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self.reference_counts = np.concatenate([feature['counts'] for feature in self.features]).astype(np.int64)
+
+        # Numeric: edges padded with +inf so that padding never counts
+        self.numeric_index = np.array([positions[feature['name']] for feature in numeric], dtype=np.int64)
+        max_edges = max([len(feature['edges']) for feature in numeric], default=1)
+        self.edges = np.full((len(numeric), max_edges), np.inf)
+        for i, feature in enumerate(numeric):
+            self.edges[i, :len(feature['edges'])] = feature['edges']
+        self.missing_bins = np.array([len(feature['edges']) + 1 for feature in numeric], dtype=np.int64)
+
+        # Categorical: one padded lookup table per feature holding flat bin positions
+        self.categorical_index = np.array([positions[feature['name']] for feature in categorical], dtype=np.int64)
+        self.max_codes = max([len(feature['lookup']) for feature in categorical], default=1)
+        lookup = np.zeros((len(categorical), self.max_codes), dtype=np.int64)
+        for i, feature in enumerate(categorical):
+            offset = self.offsets[len(numeric) + i]
+            lookup[i, :len(feature['lookup'])] = feature['lookup'] + offset
+            # Out of range codes (which the encoders never produce) land in overflow
+            lookup[i, len(feature['lookup']):] = offset + len(feature['counts']) - 1
+        self.lookup = lookup.ravel()
+        self.lookup_offsets = np.arange(len(categorical), dtype=np.int64) * self.max_codes
+
+        # Buffers reused by every update()
+        self.bins = np.zeros(len(self.features), dtype=np.int64)
+        self.numeric_bins = self.bins[:len(numeric)]
+        self.categorical_bins = self.bins[len(numeric):]
+        self.numeric_offsets = self.offsets[:len(numeric)].copy()
+        self.numeric_values = np.zeros(len(numeric))
+        self.comparisons = np.zeros(self.edges.shape, dtype=bool)
+        self.missing = np.zeros(len(numeric), dtype=bool)
+        self.categorical_values = np.zeros(len(categorical))
+        self.categorical_codes = np.zeros(len(categorical), dtype=np.int64)
+
+        # Current and previous window; encoder_marks holds the encoders'
+        # (requests, unseen) counters at the start of each of them
+        self.counts = np.zeros(len(self.reference_counts), dtype=np.int64)
+        self.previous_counts = np.zeros_like(self.counts)
+        self.rows = 0
+        self.previous_rows = 0
+        self.lock = threading.Lock()
+        self.reset_windows()
+        self.publisher_pid = None
+
+    @staticmethod
+    def with_missing_bin(feature):
+        # References saved before the missing-value bin existed
+        if feature['kind'] == 'numeric' and len(feature['counts']) == len(feature['edges']) + 1:
+            return dict(feature, counts=np.append(feature['counts'], 0), labels=list(feature['labels']) + ['(missing)'])
+        return feature
+
+    def encoder_counts(self):
+        return np.array([[self.encoders[name].seen_count, self.encoders[name].unseen_count] if name in self.encoders else [0, 0]
+                         for name in self.categorical_names], dtype=np.int64).reshape(-1, 2)
+
+    def reset_windows(self):
+        # Caller holds the lock (or no other thread can see the monitor yet)
+        self.counts[:] = 0
+        self.previous_counts[:] = 0
+        self.rows = 0
+        self.previous_rows = 0
+        self.window_started = time.monotonic()
+        self.encoder_marks = [self.encoder_counts(), self.encoder_counts()]
+
+    def roll_windows(self):
+        with self.lock:
+            elapsed = int((time.monotonic() - self.window_started) // self.window)
+            if elapsed == 0:
+                return
+            if elapsed == 1:
+                np.copyto(self.previous_counts, self.counts)
+                self.previous_rows = self.rows
+                self.encoder_marks = [self.encoder_marks[1], self.encoder_counts()]
+            else:
+                self.previous_counts[:] = 0
+                self.previous_rows = 0
+                self.encoder_marks = [self.encoder_counts(), self.encoder_counts()]
+            self.counts[:] = 0
+            self.rows = 0
+            self.window_started += elapsed * self.window
+
+    def update(self, row):
+        # row: one encoded feature row in column_names order
+        if self.directory is not None and self.publisher_pid != os.getpid():
+            self.start_publisher()
+        if time.monotonic() - self.window_started >= self.window:
+            self.roll_windows()
+
+        with self.lock:
+            np.take(row, self.numeric_index, out=self.numeric_values)
+            bin_numeric(self.numeric_values, self.edges, self.missing_bins,
+                        out=self.numeric_bins, comparisons=self.comparisons, missing=self.missing)
+            np.add(self.numeric_bins, self.numeric_offsets, out=self.numeric_bins)
+
+            np.take(row, self.categorical_index, out=self.categorical_values)
+            np.copyto(self.categorical_codes, self.categorical_values, casting='unsafe')
+            np.minimum(self.categorical_codes, self.max_codes - 1, out=self.categorical_codes)
+            np.maximum(self.categorical_codes, 0, out=self.categorical_codes)
+            np.add(self.categorical_codes, self.lookup_offsets, out=self.categorical_codes)
+            np.take(self.lookup, self.categorical_codes, out=self.categorical_bins)
+
+            np.add.at(self.counts, self.bins, 1)
+            self.rows += 1
+
+    def state(self):
+        # Mergeable snapshot of the current and previous window: every field
+        # is a count that adds across workers
+        self.roll_windows()
+        with self.lock:
+            counts = self.counts + self.previous_counts
+            rows = self.rows + self.previous_rows
+            encoder_counts = self.encoder_counts() - self.encoder_marks[0]
+        return {
+            'rows': rows,
+            'counts': counts,
+            'requests': encoder_counts[:, 0],
+            'unseen': encoder_counts[:, 1],
+        }
+
+    @staticmethod
+    def merge(states):
+        states = list(states)
+        return {key: sum(state[key] for state in states) for key in ('rows', 'counts', 'requests', 'unseen')}
+
+    def state_path(self, pid):
+        return os.path.join(self.directory, f"{self.state_prefix}{pid}.npz")
+
+    def start_publisher(self):
+        with self.lock:
+            if self.publisher_pid == os.getpid():
+                return
+            # After a fork the counts seen so far belong to the parent
+            self.reset_windows()
+            self.publisher_pid = os.getpid()
+            threading.Thread(target=self.run_publisher, name='drift-publisher', daemon=True).start()
+        atexit.register(self.remove_state)
+
+    def run_publisher(self):
+        while True:
+            time.sleep(self.publish_interval)
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Drift state publish failed: {e}")
+
+    def publish(self):
+        if self.directory is None or self.publisher_pid != os.getpid():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.state_path(os.getpid())
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **self.state())
+        os.replace(tmp_path, path)
+
+    def remove_state(self):
+        # A finished worker's counts no longer describe the live traffic
+        if self.directory is None or self.publisher_pid != os.getpid():
+            return
+        try:
+            os.remove(self.state_path(os.getpid()))
+        except FileNotFoundError:
+            pass
+
+    def published_states(self):
+        # Latest state published by every other live worker of this model and boot
+        states = []
+        if self.directory is None:
+            return states
+        own_path = self.state_path(os.getpid())
+        stale_before = time.time() - STALE_PUBLISH_INTERVALS * self.publish_interval
+        for path in glob.glob(os.path.join(self.directory, f"{self.state_prefix}*.npz")):
+            if path == own_path or path.endswith('.tmp.npz'):
+                continue
+            try:
+                if os.path.getmtime(path) < stale_before:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            try:
+                with np.load(path) as data:
+                    state = {key: data[key] for key in ('rows', 'counts', 'requests', 'unseen')}
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Skipping drift state {path}: {e}")
+                continue
+            if state['counts'].shape == self.counts.shape:
+                states.append(state)
+        return states
+
+    def report(self, include_workers=True):
+        states = [self.state()] + (self.published_states() if include_workers else [])
+        merged = self.merge(states)
+
+        features = {}
+        for i, feature in enumerate(self.features):
+            start, stop = self.offsets[i], self.offsets[i + 1]
+            live = merged['counts'][start:stop]
+            reference = self.reference_counts[start:stop]
+            total = max(int(live.sum()), 1)
+            entry = {
+                'kind': feature['kind'],
+                'psi': population_stability_index(live, reference) if live.sum() else 0.0,
+                'bins': [{'bin': label, 'live': int(count) / total, 'reference': float(ref) / max(int(reference.sum()), 1)}
+                         for label, count, ref in zip(feature['labels'], live, reference)],
+            }
+            if feature['kind'] == 'categorical':
+                j = self.categorical_names.index(feature['name'])
+                requests = int(merged['requests'][j])
+                entry['overflow_rate'] = int(live[-1]) / total
+                entry['reference_overflow_rate'] = float(reference[-1]) / max(int(reference.sum()), 1)
+                entry['unseen_rate'] = int(merged['unseen'][j]) / requests if requests else 0.0
+            features[feature['name']] = entry
+
+        return {
+            'rows': int(merged['rows']),
+            'window_seconds': self.window,
+            'reference_rows': int(self.reference['rows']),
+            'states': len(states),
+            'drifted_features': sorted(name for name, entry in features.items() if entry['psi'] > PSI_ALERT),
+            'features': features,
+        }
@@ -0,0 +1,181 @@
+from math import factorial
+import numpy as np
+
+# Exact path-dependent TreeSHAP for the boosted trees of a binary
+# GradientBoostingClassifier, vectorised over rows.
+#
+# For every leaf the root-to-leaf path is reduced to its unique features,
+# each with a "zero fraction" z (share of training cover that follows the path
+# when the feature is unknown) and an interval (lo, hi] that the feature must
+# fall in to follow the path. For a row, o = 1 if the feature is in the
+# interval. The contribution of leaf l to path feature i is then
+#
+#   v_l * (o_i - z_i) * sum_s w(s, d) * [t^s] prod_{j != i} (z_j + o_j t)
+#
+# with w(s, d) = s! (d - s - 1)! / d!. As in TreeSHAP, the full product
+# P(t) = prod_j (z_j + o_j t) is extended once per path and each factor is
+# then unwound from it, which is O(d^2) per path rather than O(d^3). When
+# o_i = 0 the factor is just z_i, so the contribution reduces to
+# -v_l * sum_s w(s, d) [t^s] P(t) and needs no division. Paths are grouped by
+# their number of unique features d, so each group is a few array operations
+# over (d, leaves, rows) regardless of how many trees there are.
+# Contributions are in log-odds, the space of decision_function, so
+# base_value + contributions.sum() == decision_function.
+#
+# Rows are explained in blocks sized so that the (d, leaves, rows) temporaries
+# of the largest group stay within BLOCK_BYTES.
+
+BLOCK_BYTES = 16 * 1024 * 1024
+# float64 (d, leaves, rows) arrays alive at once in block_shap_values
+BLOCK_ARRAYS = 6
+
+
+class TreeExplainer:
+    def __init__(self, classifier, feature_names):
+        estimators = getattr(classifier, 'estimators_', None)
+        if estimators is None or estimators.ndim != 2 or estimators.shape[1] != 1:
+            raise ValueError("TreeExplainer only supports binary GradientBoostingClassifier models")
+
+        self.feature_names = list(feature_names)
+        learning_rate = classifier.learning_rate
+
+        paths = []
+        base_value = 0.0
+        for tree in estimators[:, 0]:
+            tree_paths, tree_base = self.tree_paths(tree.tree_)
+            for features, zero_fractions, lows, highs, value in tree_paths:
+                paths.append((features, zero_fractions, lows, highs, value * learning_rate))
+            base_value += tree_base * learning_rate
+
+        # Raw score of the initial estimator (log-odds of the training prior)
+        self.init_value = float(classifier._raw_predict_init(np.zeros((1, classifier.n_features_in_)))[0, 0])
+        self.base_value = self.init_value + base_value
+
+        # Group paths by their number of unique features
+        self.groups = []
+        for depth in sorted({len(path[0]) for path in paths}):
+            group = [path for path in paths if len(path[0]) == depth]
+            if depth == 0:
+                # Single-leaf trees only shift the base value
+                continue
+            weights = np.array([factorial(s) * factorial(depth - s - 1) / factorial(depth) for s in range(depth)])
+            features = np.array([path[0] for path in group], dtype=np.int64)
+            # (slot, path) positions sorted by feature, to sum contributions per feature
+            order = np.argsort(features.T.ravel(), kind='stable')
+            sorted_features = features.T.ravel()[order]
+            starts = np.flatnonzero(np.r_[True, sorted_features[1:] != sorted_features[:-1]])
+            self.groups.append({
+                'depth': depth,
+                'features': features,
+                'zero_fractions': np.array([path[1] for path in group]),
+                'lows': np.array([path[2] for path in group]),
+                'highs': np.array([path[3] for path in group]),
+                'values': np.array([path[4] for path in group]),
+                'weights': weights,
+                'order': order,
+                'starts': starts,
+                'slot_features': sorted_features[starts],
+            })
+
+        row_bytes = max([BLOCK_ARRAYS * 8 * group['features'].size for group in self.groups], default=1)
+        self.row_block = max(1, BLOCK_BYTES // row_bytes)
+
+    @staticmethod
+    def tree_paths(tree):
+        # Returns [(features, zero_fractions, lows, highs, leaf_value)] and the
+        # cover-weighted mean leaf value of one sklearn tree
+        cover = tree.weighted_n_node_samples
+        values = tree.value[:, 0, 0]
+        paths = []
+        base_value = 0.0
+
+        stack = [(0, {})]
+        while stack:
+            node, conditions = stack.pop()
+            left, right = tree.children_left[node], tree.children_right[node]
+            if left == -1:
+                features = sorted(conditions)
+                paths.append((
+                    features,
+                    [conditions[f][0] for f in features],
+                    [conditions[f][1] for f in features],
+                    [conditions[f][2] for f in features],
+                    values[node],
+                ))
+                base_value += values[node] * cover[node] / cover[0]
+                continue
+
+            feature, threshold = tree.feature[node], tree.threshold[node]
+            zero_fraction, low, high = conditions.get(feature, (1.0, -np.inf, np.inf))
+
+            # sklearn sends x <= threshold to the left child
+            left_conditions = dict(conditions)
+            left_conditions[feature] = (zero_fraction * cover[left] / cover[node], low, min(high, threshold))
+            right_conditions = dict(conditions)
+            right_conditions[feature] = (zero_fraction * cover[right] / cover[node], max(low, threshold), high)
+            stack.append((left, left_conditions))
+            stack.append((right, right_conditions))
+
+        return paths, base_value
+
+    def shap_values(self, X):
+        # X: (n_rows, n_features) in column_names order -> (n_rows, n_features)
+        # sklearn compares float32 copies of the inputs against the thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if len(X) <= self.row_block:
+            return self.block_shap_values(X)
+        return np.vstack([self.block_shap_values(X[start:start + self.row_block])
+                          for start in range(0, len(X), self.row_block)])
+
+    def block_shap_values(self, X):
+        n_rows, n_features = X.shape
+        phi = np.zeros((n_rows, n_features))
+
+        for group in self.groups:
+            depth = group['depth']
+            features = group['features']
+            z = group['zero_fractions']
+
+            # Arrays are laid out (slot, path, row) so that every step below
+            # works on contiguous (path, row) planes
+            z = z.T[:, :, None]
+            x = X.T[features.T]
+            o = (x > group['lows'].T[:, :, None]) & (x <= group['highs'].T[:, :, None])
+            del x
+
+            # Extend: coefficients of P(t) = prod_j (z_j + o_j t)
+            coefficients = np.zeros((depth + 1, len(features), n_rows))
+            coefficients[0] = 1.0
+            for j in range(depth):
+                # Only the first j + 1 coefficients are non-zero so far
+                shifted = coefficients[:j + 1] * o[j]
+                coefficients[:j + 1] *= z[j]
+                coefficients[1:j + 2] += shifted
+            del shifted
+
+            # Unwind (z_i + t), the o_i = 1 factor, from P for every slot i at
+            # once, from the top coefficient down: q_{s-1} = p_s - z_i q_s
+            quotient = np.zeros((depth, len(features), n_rows))
+            weighted = np.zeros((depth, len(features), n_rows))
+            for s in range(depth, 0, -1):
+                quotient *= -z
+                quotient += coefficients[s]
+                weighted += group['weights'][s - 1] * quotient
+            del quotient
+
+            unknown = np.tensordot(group['weights'], coefficients[:depth], axes=1)
+            del coefficients
+            values = group['values'][:, None]
+            contributions = np.where(o, values * (1.0 - z) * weighted, -values * unknown)
+            del weighted
+
+            # Sum (slot, path) contributions per feature
+            per_feature = np.add.reduceat(contributions.reshape(-1, n_rows)[group['order']], group['starts'], axis=0)
+            phi[:, group['slot_features']] += per_feature.T
+
+        return phi
+
+    def explain(self, X):
+        # List of {feature: contribution} dictionaries, one per row
+        phi = self.shap_values(X)
+        return [dict(zip(self.feature_names, row.tolist())) for row in phi]
@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+from functions.table_io import iter_table_chunks, read_table_columns, DEFAULT_CHUNK_SIZE
+
+# uuid_org-keyed store of encoded feature vectors for /predict/by-id.
+#
+# A store version is a directory of .npy files that every worker memory-maps,
+# so the page cache holds one copy however many workers there are:
+#   features.npy  (rows, features) float32 in column_names order, encoded the
+#                 same way as batch scoring; float32 is what the trees compare
+#   keys.npy      (capacity, 2) uint64 open-addressing hash table keyed by a
+#                 128-bit blake2b digest of uuid_org
+#   rows.npy      (capacity,) int64 row of each key, -1 for empty slots
+#   meta.json     column_names and the model version the rows were encoded for
+#
+# Lookups hash the uuid and probe linearly from its home slot, so finding a
+# row touches one or two slots whatever the size of the store. The table is at
+# most half full. A store is tied to the model it was encoded for and is
+# ignored (with a message) once the model is retrained.
+#
+# Every build is written to its own <directory>/versions/<stamp> and then
+# published by atomically replacing the CURRENT pointer file, so a reader sees
+# either the old or the new version, never a mix. Servers hold a
+# LiveFeatureStore, which checks CURRENT every few seconds and switches to a
+# new version without a restart. Only the two newest versions are kept;
+# workers still mapping an older one keep reading it until they switch, since
+# deleted files stay readable while they are mapped.
+
+FILES = ('features.npy', 'keys.npy', 'rows.npy', 'meta.json')
+POINTER = 'CURRENT'
+KEEP_VERSIONS = 2
+DEFAULT_CHECK_INTERVAL = 5.0
+
+
+def uuid_keys(uuids):
+    digests = b''.join(hashlib.blake2b(str(value).encode('utf-8'), digest_size=16).digest() for value in uuids)
+    return np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+
+
+def build_hash_table(keys):
+    # Vectorised linear-probing insert; on duplicate keys the first row wins
+    n = len(keys)
+    capacity = 16
+    while capacity < 2 * n:
+        capacity *= 2
+    mask = capacity - 1
+
+    unique_index = np.unique(np.ascontiguousarray(keys).view(np.dtype((np.void, 16))).ravel(), return_index=True)[1]
+    pending = np.sort(unique_index)
+    slots = (keys[:, 0] & np.uint64(mask)).astype(np.int64)
+
+    table_keys = np.zeros((capacity, 2), dtype=np.uint64)
+    table_rows = np.full(capacity, -1, dtype=np.int64)
+    while len(pending):
+        candidates = pending[table_rows[slots[pending]] == -1]
+        taken, first = np.unique(slots[candidates], return_index=True)
+        winners = candidates[first]
+        table_rows[taken] = winners
+        table_keys[taken] = keys[winners]
+
+        placed = np.zeros(n, dtype=bool)
+        placed[winners] = True
+        pending = pending[~placed[pending]]
+        # Every remaining slot is now occupied, so move on to the next one
+        slots[pending] = (slots[pending] + 1) & mask
+
+    return table_keys, table_rows
+
+
+def source_chunks(source, columns, chunk_size):
+    # source: the DataFrame returned by clean_data() or a CSV/Parquet copy of it
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_size):
+            yield source[columns].iloc[start:start + chunk_size]
+    else:
+        yield from iter_table_chunks(source, columns=columns, chunk_size=chunk_size)
+
+
+def build_feature_store(source, directory, encoders, column_names, model_version, chunk_size=DEFAULT_CHUNK_SIZE):
+    from functions.batch_scoring import build_feature_matrix
+
+    # Pass 1: keys
+    keys = np.concatenate([uuid_keys(chunk['uuid_org']) for chunk in source_chunks(source, ['uuid_org'], chunk_size)]
+                          or [np.zeros((0, 2), dtype=np.uint64)])
+    table_keys, table_rows = build_hash_table(keys)
+
+    # Build a new version next to the live one; nothing reads it until CURRENT points to it
+    now = time.time_ns()
+    version = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now // 10 ** 9))}.{now % 10 ** 9:09d}-{os.getpid()}"
+    build_directory = os.path.join(directory, 'versions', version)
+    os.makedirs(build_directory)
+    np.save(os.path.join(build_directory, 'keys.npy'), table_keys)
+    np.save(os.path.join(build_directory, 'rows.npy'), table_rows)
+
+    # Pass 2: encoded features, written straight into the memory-mapped file
+    features = np.lib.format.open_memmap(os.path.join(build_directory, 'features.npy'), mode='w+',
+                                         dtype=np.float32, shape=(len(keys), len(column_names)))
+    available = source.columns if isinstance(source, pd.DataFrame) else read_table_columns(source)
+    present = [column for column in column_names if column in available]
+    start = 0
+    for chunk in source_chunks(source, present, chunk_size):
+        features[start:start + len(chunk)] = build_feature_matrix(chunk, encoders, column_names)
+        start += len(chunk)
+    features.flush()
+    del features
+
+    with open(os.path.join(build_directory, 'meta.json'), 'w') as file:
+        json.dump({'column_names': list(column_names), 'model_version': model_version,
+                   'rows': len(keys), 'companies': int((table_rows >= 0).sum())}, file)
+
+    pointer_path = os.path.join(directory, POINTER)
+    with open(pointer_path + '.tmp', 'w') as file:
+        file.write(version)
+    os.replace(pointer_path + '.tmp', pointer_path)
+
+    for old_version in sorted(os.listdir(os.path.join(directory, 'versions')))[:-KEEP_VERSIONS]:
+        if old_version != version:
+            shutil.rmtree(os.path.join(directory, 'versions', old_version), ignore_errors=True)
+
+    missing = [column for column in column_names if column not in present]
+    if missing:
+        print(f"Columns missing from the source, stored as 0: {', '.join(missing)}")
+    print(f"Feature store with {int((table_rows >= 0).sum())} companies written to {directory}")
+
+
+class FeatureStore:
+    def __init__(self, directory):
+        with open(os.path.join(directory, 'meta.json')) as file:
+            meta = json.load(file)
+        self.directory = directory
+        self.column_names = meta['column_names']
+        self.model_version = meta['model_version']
+        self.features = np.load(os.path.join(directory, 'features.npy'), mmap_mode='r')
+        self.keys = np.load(os.path.join(directory, 'keys.npy'), mmap_mode='r')
+        self.rows = np.load(os.path.join(directory, 'rows.npy'), mmap_mode='r')
+        self.mask = len(self.rows) - 1
+
+    def __len__(self):
+        return int(self.features.shape[0])
+
+    def row_index(self, uuid_org):
+        digest = hashlib.blake2b(str(uuid_org).encode('utf-8'), digest_size=16).digest()
+        high = int.from_bytes(digest[:8], 'little')
+        low = int.from_bytes(digest[8:], 'little')
+
+        slot = high & self.mask
+        while True:
+            row = int(self.rows[slot])
+            if row == -1:
+                return None
+            if int(self.keys[slot, 0]) == high and int(self.keys[slot, 1]) == low:
+                return row
+            slot = (slot + 1) & self.mask
+
+    def vector(self, uuid_org):
+        # Encoded features in column_names order (a read-only view), or None
+        row = self.row_index(uuid_org)
+        return None if row is None else self.features[row]
+
+
+def current_version(directory):
+    try:
+        with open(os.path.join(directory, POINTER)) as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def open_feature_store(directory, column_names, model_version, version=None):
+    # Returns None when the store is missing or was built for another model
+    version = version or current_version(directory)
+    if version is None:
+        return None
+    version_directory = os.path.join(directory, 'versions', version)
+    if not all(os.path.exists(os.path.join(version_directory, file)) for file in FILES):
+        return None
+    store = FeatureStore(version_directory)
+    if store.model_version != model_version or store.column_names != list(column_names):
+        print(f"Ignoring the feature store in {directory}: it was built for another model, rebuild it with "
+              "'python backend/Screening.py feature-store'")
+        return None
+    return store
+
+
+class LiveFeatureStore:
+    # The published version of a store, re-checked at most every check_interval seconds
+
+    def __init__(self, directory, column_names, model_version, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.directory = directory
+        self.column_names = column_names
+        self.model_version = model_version
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.version = current_version(directory)
+        self.store = open_feature_store(directory, column_names, model_version, self.version)
+        self.checked = time.monotonic()
+
+    def current(self):
+        # The FeatureStore to use for this request, or None when there is none
+        if time.monotonic() - self.checked >= self.check_interval:
+            with self.lock:
+                if time.monotonic() - self.checked >= self.check_interval:
+                    self.reload()
+        return self.store
+
+    def reload(self):
+        self.checked = time.monotonic()
+        version = current_version(self.directory)
+        if version == self.version:
+            return
+        store = open_feature_store(self.directory, self.column_names, self.model_version, version)
+        if store is not None:
+            print(f"Feature store version {version} loaded from {self.directory}")
+        self.version = version
+        self.store = store
@@ -1,12 +1,15 @@
 import os
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.model_selection import StratifiedKFold
-from sklearn.preprocessing import LabelEncoder
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.metrics import precision_score, recall_score
-from pickle import dump, load
+from pickle import dump, dumps, load
+
+from functions.categorical_encoding import FrequencyAwareEncoder, DEFAULT_MIN_COUNT, DEFAULT_NUM_BUCKETS
+from functions.table_io import iter_table_chunks, read_table_columns, DEFAULT_CHUNK_SIZE
+from functions.drift import build_drift_reference
+
+# matplotlib and the sklearn training modules are imported inside the functions
+# that use them, so that the web server (which only unpickles the model) does
+# not pay for them at startup.
 
 # Path definitions
 
@@ -15,40 +18,50 @@ data_path = os.path.join(base_path, '../data/csvs')
 pkl_path = os.path.join(base_path, '../data/pkls')
 template_path = os.path.join(base_path, '../../frontend/templates')
 
+categorical_columns = [
+    'country_code', 'region', 'city', 
+    'category_list', 'last_round_investment_type'
+]
+
+excluded_features = [
+    'uuid_org', 'name_org', 'permalink_org', 'domain', 'homepage_url', 
+    'address', 'postal_code', 'short_description', 'facebook_url', 
+    'linkedin_url', 'twitter_url', 'founded_on', 'last_funding_on', 
+    'closed_on', 'total_funding_currency_code', 'outcome', 'state_code', 
+    'status', 'total_funding', 'category_groups_list', 'founders_degree_count_mean'
+]
+
+positive_outcomes = ['FR', 'AC', 'IP']
+
+# Compaction keeps the fewest boosting stages whose mean CV log loss is within
+# this fraction of the best stage's
+DEFAULT_LOSS_TOLERANCE = 0.005
+
 def analyze_numerical_features():
+    import matplotlib.pyplot as plt
+    from sklearn.preprocessing import LabelEncoder
+
     with open(os.path.join(pkl_path, 'final_model.pkl'), 'rb') as file:
         classifier = load(file)
 
     with open(os.path.join(pkl_path, 'column_names.pkl'), 'rb') as file:
         column_names = load(file)
 
+    with open(os.path.join(pkl_path, 'label_encoders.pkl'), 'rb') as file:
+        encoders = load(file)
+
     # Assuming data is loaded from the same file and preprocessed in the same way
     data = pd.read_csv(os.path.join(data_path, 'unique_filtered_final_with_target_variable.csv'))
 
-    # Encode categorical variables
-    categorical_columns = [
-        'country_code', 'region', 'city', 
-        'category_list', 'last_round_investment_type'
-    ]
-
-    encoders = {}
-    for col in categorical_columns:
-        le = LabelEncoder()
-        data[col] = le.fit_transform(data[col].astype(str))
-        encoders[col] = le
+    # Encode categorical variables with the encoders the model was trained with
+    for col, encoder in encoders.items():
+        data[col] = encoder.transform(data[col].astype(str))
 
     # Encode target variable
     target_encoder = LabelEncoder()
     data['outcome'] = target_encoder.fit_transform(data['outcome'].astype(str))
 
     # Define features and print included and excluded features
-    excluded_features = [
-        'uuid_org', 'name_org', 'permalink_org', 'domain', 'homepage_url', 
-        'address', 'postal_code', 'short_description', 'facebook_url', 
-        'linkedin_url', 'twitter_url', 'founded_on', 'last_funding_on', 
-        'closed_on', 'total_funding_currency_code', 'outcome', 'state_code', 
-        'status', 'total_funding', 'category_groups_list', 'founders_degree_count_mean'
-    ]
     X = data.drop(columns=excluded_features)
     
     # Ensure all feature names are valid
@@ -79,38 +92,41 @@ def analyze_numerical_features():
         plt.savefig(os.path.join(base_path, f'../data/pngs/{feature}_effect.png'))
         plt.close()
 
-def train_model(data):
-    # Encode categorical variables
-    categorical_columns = [
-        'country_code', 'region', 'city', 
-        'category_list', 'last_round_investment_type'
-    ]
+def train_model(data,
+                min_category_count=DEFAULT_MIN_COUNT,
+                num_hash_buckets=DEFAULT_NUM_BUCKETS,
+                tune=False,
+                n_jobs=-1,
+                compact=True,
+                loss_tolerance=DEFAULT_LOSS_TOLERANCE,
+                drop_unused_features=True):
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+    from sklearn.metrics import precision_score, recall_score
 
+    # Encode categorical variables
+    # Values seen fewer than min_category_count times share num_hash_buckets
+    # overflow codes with the values that only show up at serving time.
     encoders = {}
     for col in categorical_columns:
-        le = LabelEncoder()
+        le = FrequencyAwareEncoder(min_count=min_category_count, num_buckets=num_hash_buckets)
         data[col] = le.fit_transform(data[col].astype(str))
         encoders[col] = le
+        print(f"{col}: {len(le.classes_)} classes, {le.rare_fraction_:.2%} of rows in overflow buckets")
 
     # Encode target variable
     target_encoder = LabelEncoder()
     data['outcome'] = target_encoder.fit_transform(data['outcome'].astype(str))
 
     # Define features and print included and excluded features
-    excluded_features = [
-        'uuid_org', 'name_org', 'permalink_org', 'domain', 'homepage_url', 
-        'address', 'postal_code', 'short_description', 'facebook_url', 
-        'linkedin_url', 'twitter_url', 'founded_on', 'last_funding_on', 
-        'closed_on', 'total_funding_currency_code', 'outcome', 'state_code', 
-        'status', 'total_funding', 'category_groups_list', 'founders_degree_count_mean'
-    ]
     X = data.drop(columns=excluded_features)
 
     # Save the column names
     column_names = X.columns.tolist()
 
     # Binary target for the specified classification
-    data['CL/NE_vs_FR/AC/IP'] = data['outcome'].apply(lambda x: 1 if x in target_encoder.transform(['FR', 'AC', 'IP']) else 0)
+    data['CL/NE_vs_FR/AC/IP'] = data['outcome'].apply(lambda x: 1 if x in target_encoder.transform(positive_outcomes) else 0)
 
     # Define classifier
     #classifier = RandomForestClassifier()
@@ -127,14 +143,31 @@ def train_model(data):
     #recall_scores = []
 
     #feature_importances = []
+
+    # Tuning mode: successive-halving search over the same folds (see
+    # functions/tuning.py). The search already cross-validates every
+    # candidate, so the plain CV loop below is skipped.
+    tuning_results = None
+    cv_splits = skf.split(X, y)
+    fold_curves = []
+    if tune:
+        tuning_results = tune_classifier(X, y, skf, n_jobs)
+        classifier = GradientBoostingClassifier(**tuning_results['params'],
+                                                n_estimators=tuning_results['n_estimators'],
+                                                random_state=42)
+        cv_splits = []
+        fold_curves = tuning_results['fold_curves']
     
-    for train_index, test_index in skf.split(X, y):
+    for train_index, test_index in cv_splits:
         X_train, X_test = X.iloc[train_index], X.iloc[test_index]
         y_train, y_test = y.iloc[train_index], y.iloc[test_index]
         
         classifier.fit(X_train, y_train)
         y_pred = classifier.predict(X_test)
         y_proba = classifier.predict_proba(X_test)[:, 1]  # Probability of the positive class
+
+        # Validation loss after every stage, used to compact the final model
+        fold_curves.append(staged_log_losses(classifier, X_test, y_test))
         
         #precision_scores.append(precision_score(y_test, y_pred, zero_division=0))
         #recall_scores.append(recall_score(y_test, y_pred, zero_division=0))
@@ -178,18 +211,320 @@ def train_model(data):
     #         'feature_importances': feature_importance_df
     #     }, file)
 
+    # Serve the smallest ensemble that is as good on the CV folds
+    compaction_report = None
+    if compact:
+        classifier, column_names, compaction_report = compact_model(classifier, column_names, fold_curves, X,
+                                                                    loss_tolerance, drop_unused_features)
+
+    # Reference histograms for the drift monitor (see functions/drift.py)
+    drift_reference = build_drift_reference(X[column_names], encoders)
+
+    save_model_artifacts(classifier, encoders, column_names, target_encoder, drift_reference, tuning_results, compaction_report)
+
+def tune_classifier(X, y, cv, n_jobs=-1):
+    from functions.tuning import successive_halving_search
+
+    tuning_results = successive_halving_search(X, y, cv, n_jobs=n_jobs)
+    metrics = tuning_results['cv_metrics']
+    print(f"Best configuration: {tuning_results['params']} with {tuning_results['n_estimators']} stages")
+    print(f"CV log loss = {metrics['log_loss']:.4f} (std {metrics['log_loss_std']:.4f}), "
+          f"ROC AUC = {metrics['roc_auc']:.4f}, precision = {metrics['precision']:.4f}, recall = {metrics['recall']:.4f}")
+    return tuning_results
+
+def staged_log_losses(classifier, X_test, y_test):
+    from sklearn.metrics import log_loss
+    return [log_loss(y_test, proba[:, 1], labels=[0, 1]) for proba in classifier.staged_predict_proba(X_test)]
+
+def cv_stage_losses(classifier, X, y, cv):
+    # Per-fold staged validation losses for an unfitted classifier
+    from sklearn.base import clone
+
+    fold_curves = []
+    for train_index, test_index in cv.split(X, y):
+        fold_classifier = clone(classifier).fit(X.iloc[train_index], y[train_index])
+        fold_curves.append(staged_log_losses(fold_classifier, X.iloc[test_index], y[test_index]))
+    return fold_curves
+
+def truncate_ensemble(classifier, n_stages):
+    # Keeps the first n_stages trees of a fitted GradientBoostingClassifier
+    classifier.estimators_ = classifier.estimators_[:n_stages]
+    classifier.train_score_ = classifier.train_score_[:n_stages]
+    for attribute in ('oob_improvement_', 'oob_scores_'):
+        if hasattr(classifier, attribute):
+            setattr(classifier, attribute, getattr(classifier, attribute)[:n_stages])
+    classifier.n_estimators = n_stages
+    classifier.n_estimators_ = n_stages
+
+def remove_unused_features(classifier, column_names):
+    # Drops the columns no tree splits on and renumbers the tree nodes to match
+    from sklearn.tree._tree import Tree
+
+    used = sorted({int(feature) for tree in classifier.estimators_[:, 0] for feature in tree.tree_.feature if feature >= 0})
+    if len(used) == len(column_names):
+        return column_names
+
+    remap = np.full(len(column_names), -1, dtype=np.intp)
+    remap[used] = np.arange(len(used))
+    for tree in classifier.estimators_[:, 0]:
+        state = tree.tree_.__getstate__()
+        nodes = state['nodes'].copy()
+        splits = nodes['feature'] >= 0
+        nodes['feature'][splits] = remap[nodes['feature'][splits]]
+        state['nodes'] = nodes
+        compacted = Tree(len(used), tree.tree_.n_classes, tree.tree_.n_outputs)
+        compacted.__setstate__(state)
+        tree.tree_ = compacted
+        tree.n_features_in_ = len(used)
+        tree.__dict__.pop('feature_names_in_', None)
+        tree.max_features_ = min(tree.max_features_, len(used))
+
+    kept = [column_names[i] for i in used]
+    classifier.n_features_in_ = len(used)
+    if hasattr(classifier, 'feature_names_in_'):
+        classifier.feature_names_in_ = np.array(kept, dtype=object)
+    classifier.max_features_ = min(classifier.max_features_, len(used))
+    return kept
+
+def single_row_latency_ms(classifier, rows, repeats=200):
+    # Median predict_proba time for one row, the way /predict calls it
+    import time
+    import warnings
+
+    timings = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for i in range(repeats):
+            row = rows[i % len(rows)][None, :]
+            started = time.perf_counter()
+            classifier.predict_proba(row)
+            timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1000)
+
+def compact_model(classifier, column_names, fold_curves, X,
+                  loss_tolerance=DEFAULT_LOSS_TOLERANCE,
+                  drop_unused_features=True):
+    # Truncates a fitted GradientBoostingClassifier to the fewest stages whose
+    # mean CV log loss is within loss_tolerance (relative) of the best stage,
+    # then optionally drops the features that none of the kept trees use.
+    # X is the training frame, used to time single-row predictions.
+    n_stages = len(classifier.estimators_)
+    curve = np.mean([np.asarray(fold_curve)[:n_stages] for fold_curve in fold_curves], axis=0)
+    if len(curve) < n_stages:
+        print("Compaction skipped: the CV loss curves are shorter than the model")
+        return classifier, column_names, None
+
+    best_loss = curve.min()
+    keep_stages = int(np.argmax(curve <= best_loss * (1 + loss_tolerance))) + 1
+
+    sample = X[column_names].to_numpy(dtype=np.float64)[:1000]
+    before = {
+        'stages': n_stages,
+        'features': len(column_names),
+        'size_bytes': len(dumps(classifier)),
+        'latency_ms': single_row_latency_ms(classifier, sample),
+        'cv_log_loss': float(curve[-1]),
+    }
+    proba_before = classifier.predict_proba(X[column_names].iloc[:1000])[:, 1]
+
+    truncate_ensemble(classifier, keep_stages)
+    kept_columns = remove_unused_features(classifier, column_names) if drop_unused_features else column_names
+    kept_sample = sample[:, [column_names.index(column) for column in kept_columns]]
+
+    after = {
+        'stages': keep_stages,
+        'features': len(kept_columns),
+        'size_bytes': len(dumps(classifier)),
+        'latency_ms': single_row_latency_ms(classifier, kept_sample),
+        'cv_log_loss': float(curve[keep_stages - 1]),
+    }
+    proba_after = classifier.predict_proba(X[kept_columns].iloc[:1000])[:, 1]
+
+    report = {
+        'loss_tolerance': loss_tolerance,
+        'before': before,
+        'after': after,
+        'dropped_features': [column for column in column_names if column not in kept_columns],
+        'max_probability_change': float(np.abs(proba_after - proba_before).max()),
+        'decision_agreement': float(np.mean((proba_after >= 0.5) == (proba_before >= 0.5))),
+    }
+    print(f"Compacted model: {n_stages} -> {keep_stages} stages, {len(column_names)} -> {len(kept_columns)} features, "
+          f"{before['size_bytes'] / 1024:.0f} -> {after['size_bytes'] / 1024:.0f} KiB, "
+          f"{before['latency_ms']:.3f} -> {after['latency_ms']:.3f} ms per row, "
+          f"CV log loss {before['cv_log_loss']:.4f} -> {after['cv_log_loss']:.4f}")
+    if report['dropped_features']:
+        print(f"Features no tree uses: {', '.join(report['dropped_features'])}")
+
+    return classifier, kept_columns, report
+
+def save_model_artifacts(classifier, encoders, column_names, target_encoder, drift_reference=None, tuning_results=None,
+                         compaction_report=None, path=pkl_path):
     # Save the trained classifier
-    with open(os.path.join(pkl_path, 'final_model.pkl'), 'wb') as file:
+    with open(os.path.join(path, 'final_model.pkl'), 'wb') as file:
         dump(classifier, file)
 
     # Save the label encoders
-    with open(os.path.join(pkl_path, 'label_encoders.pkl'), 'wb') as file:
+    with open(os.path.join(path, 'label_encoders.pkl'), 'wb') as file:
         dump(encoders, file)
 
     # Save the column names
-    with open(os.path.join(pkl_path, 'column_names.pkl'), 'wb') as file:
+    with open(os.path.join(path, 'column_names.pkl'), 'wb') as file:
         dump(column_names, file)
 
     # Save the target encoder
-    with open(os.path.join(pkl_path, 'target_encoder.pkl'), 'wb') as file:
-        dump(target_encoder, file)
\ No newline at end of file
+    with open(os.path.join(path, 'target_encoder.pkl'), 'wb') as file:
+        dump(target_encoder, file)
+
+    # Save the drift reference histograms
+    if drift_reference is not None:
+        with open(os.path.join(path, 'drift_reference.pkl'), 'wb') as file:
+            dump(drift_reference, file)
+
+    # Save the tuned configuration and its CV metrics
+    if tuning_results is not None:
+        with open(os.path.join(path, 'tuning_results.pkl'), 'wb') as file:
+            dump(tuning_results, file)
+
+    # Save what compaction removed and what it cost
+    if compaction_report is not None:
+        with open(os.path.join(path, 'compaction_report.pkl'), 'wb') as file:
+            dump(compaction_report, file)
+
+def load_drift_reference(path=pkl_path):
+    # Optional: models trained before the drift monitor have no reference
+    reference_path = os.path.join(path, 'drift_reference.pkl')
+    if not os.path.exists(reference_path):
+        return None
+    with open(reference_path, 'rb') as file:
+        return load(file)
+
+def load_model_artifacts(path=pkl_path):
+    with open(os.path.join(path, 'final_model.pkl'), 'rb') as file:
+        classifier = load(file)
+    with open(os.path.join(path, 'label_encoders.pkl'), 'rb') as file:
+        encoders = load(file)
+    with open(os.path.join(path, 'column_names.pkl'), 'rb') as file:
+        column_names = load(file)
+    with open(os.path.join(path, 'target_encoder.pkl'), 'rb') as file:
+        target_encoder = load(file)
+
+    # Older artifacts pickled plain LabelEncoders; give them the same bounded,
+    # deterministic handling of unseen values as newly trained encoders.
+    encoders = {column: encoder if isinstance(encoder, FrequencyAwareEncoder) else FrequencyAwareEncoder.from_label_encoder(encoder)
+                for column, encoder in encoders.items()}
+
+    return classifier, encoders, column_names, target_encoder
+
+def table_value_counts(table_path, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Categorical value counts and outcome counts of a whole table, one chunk at a time
+    category_counts = {col: pd.Series(dtype=np.int64) for col in categorical_columns}
+    outcome_counts = pd.Series(dtype=np.int64)
+    for chunk in iter_table_chunks(table_path, columns=columns, chunk_size=chunk_size):
+        for col in categorical_columns:
+            category_counts[col] = category_counts[col].add(chunk[col].astype(str).value_counts(), fill_value=0)
+        outcome_counts = outcome_counts.add(chunk['outcome'].astype(str).value_counts(), fill_value=0)
+    return category_counts, outcome_counts
+
+
+def stratified_reservoir_sample(chunks, capacities, num_features, rng):
+    # Uniform sample of capacities[label] rows of each binary class from a
+    # stream of (X, y) chunks: Algorithm R per class, vectorised per chunk
+    reservoirs = [np.empty((capacity, num_features), dtype=np.float64) for capacity in capacities]
+    seen = np.zeros(2, dtype=np.int64)
+
+    for X_chunk, y_chunk in chunks:
+        for label in (0, 1):
+            rows = X_chunk[y_chunk == label]
+            if len(rows) == 0 or capacities[label] == 0:
+                continue
+            positions = seen[label] + np.arange(len(rows))
+            seen[label] += len(rows)
+
+            # Fill the reservoir first, then replace slot j with probability capacity / (position + 1)
+            filling = positions < capacities[label]
+            reservoirs[label][positions[filling]] = rows[filling]
+            slots = (rng.random((~filling).sum()) * (positions[~filling] + 1)).astype(np.int64)
+            keep = slots < capacities[label]
+            reservoirs[label][slots[keep]] = rows[~filling][keep]
+
+    X = np.vstack(reservoirs)
+    y = np.concatenate([np.full(capacity, label) for label, capacity in enumerate(capacities)])
+    return X, y
+
+
+def train_model_out_of_core(table_path,
+                            sample_size=500_000,
+                            chunk_size=DEFAULT_CHUNK_SIZE,
+                            min_category_count=DEFAULT_MIN_COUNT,
+                            num_hash_buckets=DEFAULT_NUM_BUCKETS,
+                            random_state=42,
+                            tune=False,
+                            n_jobs=-1,
+                            compact=True,
+                            loss_tolerance=DEFAULT_LOSS_TOLERANCE,
+                            drop_unused_features=True):
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    # Trains on a cleaned feature table that does not fit in memory.
+    # The table (Parquet or CSV) is streamed twice, one chunk at a time:
+    #   1. count categorical values and outcomes to fit the encoders
+    #   2. encode each chunk and keep a stratified reservoir sample of at most
+    #      sample_size rows, allocated to each class by its share of the table
+    # The classifier is then fit on the reservoir, so peak memory depends on
+    # sample_size and chunk_size, not on the size of the table.
+    column_names = [column for column in read_table_columns(table_path) if column not in excluded_features]
+    columns = column_names + ['outcome']
+
+    # Pass 1: value counts
+    category_counts, outcome_counts = table_value_counts(table_path, columns, chunk_size)
+
+    encoders = {}
+    for col in categorical_columns:
+        encoders[col] = FrequencyAwareEncoder(min_count=min_category_count, num_buckets=num_hash_buckets).fit_counts(category_counts[col])
+    del category_counts
+
+    target_encoder = LabelEncoder()
+    target_encoder.fit(outcome_counts.index.tolist())
+
+    # Reservoir capacity per binary class, proportional to the class share
+    positives = int(outcome_counts[outcome_counts.index.isin(positive_outcomes)].sum())
+    class_totals = np.array([outcome_counts.sum() - positives, positives], dtype=np.int64)
+    capacities = np.minimum(class_totals, np.ceil(sample_size * class_totals / max(class_totals.sum(), 1)).astype(np.int64))
+
+    # Pass 2: encode and sample
+    def encoded_chunks():
+        for chunk in iter_table_chunks(table_path, columns=columns, chunk_size=chunk_size):
+            for col in categorical_columns:
+                chunk[col] = encoders[col].transform(chunk[col])
+            yield chunk[column_names].to_numpy(dtype=np.float64), chunk['outcome'].astype(str).isin(positive_outcomes).to_numpy()
+
+    X, y = stratified_reservoir_sample(encoded_chunks(), capacities, len(column_names), np.random.default_rng(random_state))
+    X = pd.DataFrame(X, columns=column_names)
+
+    print(f"Training on a stratified sample of {len(X)} out of {int(class_totals.sum())} rows")
+    tuning_results = None
+    classifier = GradientBoostingClassifier()
+    skf = StratifiedKFold(n_splits=5, shuffle=True, random_state=random_state)
+    if tune:
+        tuning_results = tune_classifier(X, y, skf, n_jobs)
+        classifier = GradientBoostingClassifier(**tuning_results['params'],
+                                                n_estimators=tuning_results['n_estimators'],
+                                                random_state=random_state)
+        fold_curves = tuning_results['fold_curves']
+    elif compact:
+        fold_curves = cv_stage_losses(classifier, X, y, skf)
+    classifier.fit(X, y)
+
+    compaction_report = None
+    if compact:
+        classifier, column_names, compaction_report = compact_model(classifier, column_names, fold_curves, X,
+                                                                    loss_tolerance, drop_unused_features)
+
+    # The reservoir keeps each class at its share of the table, so it also
+    # serves as the drift reference sample
+    drift_reference = build_drift_reference(X[column_names], encoders)
+
+    save_model_artifacts(classifier, encoders, column_names, target_encoder, drift_reference, tuning_results,
+                         compaction_report)
@@ -0,0 +1,194 @@
+import math
+import threading
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Fields accepted by /predict: (feature column, request field, type, required)
+# The feature column is the name used in column_names.pkl, the request field
+# is the name clients send (form, JSON or msgpack keys are all the same).
+PREDICT_FIELDS = [
+    ('country_code', 'company_country_code', 'category', True),
+    ('region', 'company_region', 'category', True),
+    ('city', 'company_city', 'category', True),
+    ('category_list', 'company_category_list', 'category', True),
+    ('last_round_investment_type', 'company_last_round_investment_type', 'category', True),
+    ('num_funding_rounds', 'company_num_funding_rounds', 'int', True),
+    ('total_funding_usd', 'company_total_funding_usd', 'float', True),
+    ('age_months', 'company_age_months', 'int', True),
+    ('has_facebook_url', 'company_has_facebook_url', 'int', False),
+    ('has_twitter_url', 'company_has_twitter_url', 'int', False),
+    ('has_linkedin_url', 'company_has_linkedin_url', 'int', False),
+    ('round_count', 'company_round_count', 'int', True),
+    ('raised_amount_usd', 'company_raised_amount_usd', 'float', True),
+    ('last_round_raised_amount_usd', 'company_last_round_raised_amount_usd', 'float', True),
+    ('last_round_post_money_valuation', 'company_last_round_post_money_valuation', 'float', True),
+    ('last_round_timelapse_months', 'company_last_round_timelapse_months', 'int', True),
+    ('last_round_investor_count', 'company_last_round_investor_count', 'int', True),
+    ('founders_dif_country_count', 'company_founders_dif_country_count', 'int', True),
+    ('founders_male_count', 'company_founders_male_count', 'int', True),
+    ('founders_female_count', 'company_founders_female_count', 'int', True),
+    ('founders_degree_count_total', 'company_founders_degree_count_total', 'int', True),
+    ('founders_degree_count_max', 'company_founders_degree_count_max', 'int', True),
+]
+
+FORM_CONTENT_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+JSON_CONTENT_TYPES = ('application/json',)
+MSGPACK_CONTENT_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+class RequestValidationError(Exception):
+    def __init__(self, message, details=None, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.details = details or []
+        self.status_code = status_code
+
+    def to_dict(self):
+        return {'error': self.message, 'details': self.details}
+
+
+def parse_int(value):
+    # JSON true/false arrive as bool, which int() would quietly accept
+    if isinstance(value, bool):
+        raise ValueError(f"expected a number, got {value!r}")
+    if isinstance(value, str):
+        value = value.replace(',', '').strip()
+        return int(value)
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"invalid literal for int(): {value!r}")
+    return int(value)
+
+
+def parse_float(value):
+    if isinstance(value, bool):
+        raise ValueError(f"expected a number, got {value!r}")
+    if isinstance(value, str):
+        value = value.replace(',', '').strip()
+    value = float(value)
+    # Rejects 'nan', 'inf' and literals such as 1e400 that overflow to inf
+    if not math.isfinite(value):
+        raise ValueError(f"expected a finite number, got {value!r}")
+    return value
+
+
+def parse_category(value):
+    if not isinstance(value, str):
+        raise ValueError(f"expected a string, got {type(value).__name__}")
+    return value
+
+
+def parse_flag(value, field='explain'):
+    # Query string / form flags such as explain=true
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ('1', 'true', 'yes', 'on'):
+            return True
+        if value in ('', '0', 'false', 'no', 'off'):
+            return False
+        raise RequestValidationError("Invalid input data", [{'field': field, 'message': f"Expected a boolean, got {value!r}"}])
+    return bool(value)
+
+
+PARSERS = {
+    'int': parse_int,
+    'float': parse_float,
+    'category': parse_category,
+}
+
+
+class FeatureParser:
+    # Compiled once at startup from column_names so that every request only
+    # walks a flat list of (field, parser, position) steps and writes straight
+    # into a preallocated row in model column order.
+    #
+    # Every public field is validated, including those whose column the model
+    # no longer uses after compaction (position None): those are checked and
+    # then left out of the row, so the API does not change with the model.
+
+    def __init__(self, column_names, encode_category, fields=PREDICT_FIELDS):
+        positions = {name: i for i, name in enumerate(column_names)}
+        self.num_features = len(column_names)
+        self.encode_category = encode_category
+        self.steps = [
+            (column, field, kind, PARSERS[kind], required, positions.get(column))
+            for column, field, kind, required in fields
+        ]
+        self.local = threading.local()
+
+    def row_buffer(self):
+        # One reusable (1, n_features) buffer per thread, zeroed per request
+        # so columns without a request field keep the old reindex fill value.
+        row = getattr(self.local, 'row', None)
+        if row is None:
+            row = self.local.row = np.zeros((1, self.num_features), dtype=np.float64)
+        else:
+            row.fill(0)
+        return row
+
+    @property
+    def fields(self):
+        return [field for _, field, _, _, _, _ in self.steps]
+
+    @property
+    def model_fields(self):
+        # Fields that are written into the row, i.e. whose column the model uses
+        return [field for _, field, _, _, _, position in self.steps if position is not None]
+
+    def parse(self, payload, out=None, partial=False):
+        # partial=True only overwrites the fields present in the payload, for
+        # what-if overrides on top of a row that is already filled in
+        row = self.row_buffer() if out is None else out
+        values = row[0]
+        errors = []
+
+        for column, field, kind, parse, required, position in self.steps:
+            value = payload.get(field)
+            if value is None or value == '':
+                if required and not partial:
+                    errors.append({'field': field, 'message': 'This field is required.'})
+                continue
+            try:
+                parsed = parse(value)
+                if position is None:
+                    continue
+                if kind == 'category':
+                    parsed = self.encode_category(column, parsed)
+                values[position] = parsed
+            except (TypeError, ValueError, OverflowError) as e:
+                errors.append({'field': field, 'message': f"Expected {kind}: {e}"})
+
+        if errors:
+            raise RequestValidationError("Invalid input data", errors)
+
+        return row
+
+
+def read_request_payload(request):
+    # Returns a mapping of field -> raw value for form, JSON and msgpack bodies
+    content_type = request.mimetype
+
+    if not content_type or content_type in FORM_CONTENT_TYPES:
+        return request.form
+
+    if content_type in JSON_CONTENT_TYPES:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            raise RequestValidationError("Request body must be a JSON object")
+        return payload
+
+    if content_type in MSGPACK_CONTENT_TYPES:
+        if msgpack is None:
+            raise RequestValidationError("msgpack bodies are not supported on this server", status_code=415)
+        try:
+            payload = msgpack.unpackb(request.get_data(), raw=False)
+        except Exception:
+            raise RequestValidationError("Request body is not valid msgpack")
+        if not isinstance(payload, dict):
+            raise RequestValidationError("Request body must be a msgpack map")
+        return payload
+
+    raise RequestValidationError(f"Unsupported content type: {content_type}", status_code=415)
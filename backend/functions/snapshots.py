@@ -0,0 +1,279 @@
+import os
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+
+from functions.data_cleaning import (organization_columns_to_drop, clean_people_and_degrees_csv,
+                                     has_url, WINDOW_YEARS)
+from functions.table_io import read_matching_rows
+
+logger = logging.getLogger(__name__)
+
+# Point-in-time feature engine.
+#
+# clean_data() rebuilds the whole pipeline for a single simulation start date.
+# Here every event table is read and sorted once by (org, date); features and
+# labels for each requested sim_start_date are then answered with
+# np.searchsorted over the sorted event keys (as-of counts, cumulative sums
+# and "last event before" lookups), so each extra snapshot costs a handful of
+# vectorised passes instead of a full re-run.
+#
+# Unlike clean_data(), the later-stage (series B+) filter only looks at rounds
+# announced before each sim_start_date, so no snapshot sees future rounds.
+# The funding totals, status and closed_on of organizations.csv are export-time
+# values, so they are recomputed as of sim_start_date from the event tables.
+
+LATE_STAGE_ROUNDS = ['series_b', 'series_c', 'series_d', 'series_e', 'series_f', 'series_g']
+
+# Days are shifted into [0, DAY_SPAN) so (org, day) packs into one int64 key
+DAY_OFFSET = 200_000
+DAY_SPAN = 400_000
+
+# Part of the cache key; bump it whenever build_snapshot() output changes
+SNAPSHOT_VERSION = 2
+
+
+def to_days(values):
+    dates = pd.to_datetime(pd.Series(values), errors='coerce')
+    days = dates.to_numpy(dtype='datetime64[D]').astype(np.int64) + DAY_OFFSET
+    days[dates.isna().to_numpy()] = -1
+    return days
+
+
+def timestamp_to_day(timestamp):
+    return int(np.datetime64(pd.Timestamp(timestamp), 'D').astype(np.int64)) + DAY_OFFSET
+
+
+def days_to_dates(days):
+    return pd.to_datetime((days - DAY_OFFSET).astype('datetime64[D]'))
+
+
+class EventIndex:
+    # Events (rounds, acquisitions, IPOs...) sorted by (org code, day)
+
+    def __init__(self, org_codes, days, num_orgs):
+        valid = (org_codes >= 0) & (days >= 0)
+        positions = np.flatnonzero(valid)
+        org_codes, days = org_codes[valid], days[valid]
+        order = np.lexsort((days, org_codes))
+
+        # Original row of every sorted event, to gather attribute columns
+        self.rows = positions[order]
+        self.keys = org_codes[order] * DAY_SPAN + days[order]
+        self.org_starts = np.searchsorted(self.keys, np.arange(num_orgs, dtype=np.int64) * DAY_SPAN)
+
+    def position(self, org_codes, day, side='left'):
+        # Index of the first event of each org on/after `day` (side='left')
+        # or after `day` (side='right')
+        return np.searchsorted(self.keys, org_codes * DAY_SPAN + day, side=side)
+
+    def count_before(self, org_codes, day):
+        return self.position(org_codes, day) - self.org_starts[org_codes]
+
+    def count_between(self, org_codes, first_day, last_day):
+        return self.position(org_codes, last_day, side='right') - self.position(org_codes, first_day)
+
+
+def read_event_table(path, org_column, date_column, org_index, columns=None):
+    table = pd.read_csv(path, usecols=columns)
+    org_codes = org_index.get_indexer(table[org_column]).astype(np.int64)
+    return table, EventIndex(org_codes, to_days(table[date_column]), len(org_index))
+
+
+def load_snapshot_tables(organization_path,
+                         funding_rounds_path,
+                         acquisitions_path,
+                         ipos_path,
+                         investments_path,
+                         people_path,
+                         degrees_path):
+    # Everything that does not depend on the simulation date, computed once
+    logger.info("Reading organizations.csv")
+    orgs = pd.read_csv(organization_path)
+    orgs = orgs[orgs['domain'] == 'company']
+    orgs = orgs.drop(columns=organization_columns_to_drop, errors='ignore')
+    orgs = orgs.drop_duplicates(subset=['uuid']).reset_index(drop=True)
+    orgs = orgs.rename(columns={'uuid': 'uuid_org', 'name': 'name_org', 'permalink': 'permalink_org'})
+    orgs['founded_on'] = pd.to_datetime(orgs['founded_on'], errors='coerce')
+    orgs['closed_on'] = pd.to_datetime(orgs['closed_on'], errors='coerce')
+
+    org_index = pd.Index(orgs['uuid_org'])
+
+    logger.info("Reading funding_rounds.csv, acquisitions.csv and ipos.csv")
+    rounds, round_events = read_event_table(funding_rounds_path, 'org_uuid', 'announced_on', org_index,
+                                            ['uuid', 'org_uuid', 'announced_on', 'investment_type',
+                                             'raised_amount_usd', 'post_money_valuation_usd'])
+    _, acquisition_events = read_event_table(acquisitions_path, 'acquiree_uuid', 'acquired_on', org_index,
+                                             ['acquiree_uuid', 'acquired_on'])
+    _, ipo_events = read_event_table(ipos_path, 'org_uuid', 'went_public_on', org_index,
+                                     ['org_uuid', 'went_public_on'])
+
+    late_stage = rounds['investment_type'].isin(LATE_STAGE_ROUNDS).to_numpy()
+    late_stage_events = EventIndex(np.where(late_stage, org_index.get_indexer(rounds['org_uuid']), -1).astype(np.int64),
+                                   to_days(rounds['announced_on']), len(org_index))
+
+    # Round attributes in sorted event order, with a running total of money raised
+    sorted_rounds = rounds.iloc[round_events.rows].reset_index(drop=True)
+    raised = pd.to_numeric(sorted_rounds['raised_amount_usd'], errors='coerce').fillna(0).to_numpy()
+    raised_cumsum = np.concatenate([[0.0], np.cumsum(raised)])
+
+    logger.info("Reading investments.csv")
+    investments = read_matching_rows(investments_path, 'funding_round_uuid', sorted_rounds['uuid'],
+                                     columns=['funding_round_uuid', 'investor_uuid'])
+    investor_count = investments.groupby('funding_round_uuid')['investor_uuid'].nunique()
+    sorted_rounds['investor_countwup'] = sorted_rounds['uuid'].map(investor_count)
+    del investments
+
+    logger.info("Reading people.csv and degrees.csv")
+    founders = clean_people_and_degrees_csv(people_path, degrees_path, orgs[['uuid_org']].copy())
+
+    return {
+        'orgs': orgs,
+        'founded_days': to_days(orgs['founded_on']),
+        'closed_days': to_days(orgs['closed_on']),
+        'round_events': round_events,
+        'acquisition_events': acquisition_events,
+        'ipo_events': ipo_events,
+        'late_stage_events': late_stage_events,
+        'sorted_rounds': sorted_rounds,
+        'raised_cumsum': raised_cumsum,
+        'founders': founders.drop(columns=['uuid_org']),
+    }
+
+
+def build_snapshot(tables, sim_start_date, warmup_years=WINDOW_YEARS, sim_years=WINDOW_YEARS):
+    sim_start_date = pd.Timestamp(sim_start_date)
+    start_day = timestamp_to_day(sim_start_date - pd.DateOffset(years=warmup_years))
+    sim_start_day = timestamp_to_day(sim_start_date)
+    sim_end_day = timestamp_to_day(sim_start_date + pd.DateOffset(years=sim_years)) - 1
+    end_day = sim_start_day - 1
+
+    # Companies founded in the warmup window
+    founded_days = tables['founded_days']
+    codes = np.flatnonzero((founded_days >= start_day) & (founded_days <= end_day)).astype(np.int64)
+
+    # Drop companies that closed, were acquired, IPO'd or passed series B before sim_start_date
+    closed_days = tables['closed_days'][codes]
+    keep = ~((closed_days >= start_day) & (closed_days <= end_day))
+    keep &= tables['acquisition_events'].count_between(codes, start_day, end_day) == 0
+    keep &= tables['ipo_events'].count_between(codes, start_day, end_day) == 0
+    keep &= tables['late_stage_events'].count_before(codes, sim_start_day) == 0
+    codes = codes[keep]
+
+    snapshot = tables['orgs'].iloc[codes].reset_index(drop=True)
+    snapshot['age_months'] = np.ceil((sim_start_day - founded_days[codes]) / 30)
+    snapshot['has_facebook_url'] = snapshot['facebook_url'].apply(has_url)
+    snapshot['has_twitter_url'] = snapshot['twitter_url'].apply(has_url)
+    snapshot['has_linkedin_url'] = snapshot['linkedin_url'].apply(has_url)
+
+    # As-of funding round features
+    round_events = tables['round_events']
+    sorted_rounds = tables['sorted_rounds']
+    first = round_events.org_starts[codes]
+    after = round_events.position(codes, sim_start_day)
+    has_rounds = after > first
+    last = np.where(has_rounds, after - 1, 0)
+
+    snapshot['round_count'] = after - first
+    snapshot['raised_amount_usd'] = tables['raised_cumsum'][after] - tables['raised_cumsum'][first]
+
+    last_rounds = sorted_rounds.iloc[last].reset_index(drop=True)
+    last_round_days = round_events.keys[last] % DAY_SPAN
+    snapshot['last_round_investment_type'] = last_rounds['investment_type'].where(has_rounds)
+    snapshot['last_round_raised_amount_usd'] = last_rounds['raised_amount_usd'].where(has_rounds)
+    snapshot['last_round_post_money_valuation'] = last_rounds['post_money_valuation_usd'].where(has_rounds)
+    snapshot['last_round_timelapse_months'] = np.where(has_rounds, np.ceil((sim_start_day - last_round_days) / 30), np.nan)
+    snapshot['investor_countwup'] = last_rounds['investor_countwup'].where(has_rounds)
+    snapshot['last_round_investor_count'] = (snapshot['investor_countwup'] > 0).astype(int)
+
+    # organizations.csv columns that describe the export date, as of sim_start_date
+    snapshot['num_funding_rounds'] = snapshot['round_count']
+    snapshot['total_funding_usd'] = snapshot['raised_amount_usd']
+    snapshot['total_funding'] = snapshot['raised_amount_usd']
+    snapshot['total_funding_currency_code'] = 'USD'
+    snapshot['last_funding_on'] = days_to_dates(last_round_days).where(has_rounds)
+    # Companies that closed, were acquired or went public before sim_start_date are gone
+    snapshot['status'] = 'operating'
+    snapshot['closed_on'] = pd.NaT
+
+    snapshot = pd.concat([snapshot, tables['founders'].iloc[codes].reset_index(drop=True)], axis=1)
+
+    # Labels from events in the simulation window, same precedence as define_*
+    acquired = tables['acquisition_events'].count_between(codes, sim_start_day, sim_end_day) > 0
+    went_public = tables['ipo_events'].count_between(codes, sim_start_day, sim_end_day) > 0
+    raised_round = round_events.count_between(codes, sim_start_day, sim_end_day) > 0
+    closed_days = tables['closed_days'][codes]
+    closed = (closed_days >= sim_start_day) & (closed_days <= sim_end_day)
+
+    outcome = np.full(len(codes), 'NE', dtype=object)
+    outcome[acquired] = 'AC'
+    outcome[went_public] = 'IP'
+    outcome[raised_round & ~went_public & ~acquired] = 'FR'
+    outcome[closed & (outcome != 'AC')] = 'CL'
+    snapshot['outcome'] = outcome
+
+    # Missing numbers become 0 like in clean_investments_csv; companies without
+    # a round get '0' as their round type, which is what str(0) encodes to there
+    numeric = snapshot.select_dtypes(include=['number']).columns
+    snapshot[numeric] = snapshot[numeric].fillna(0)
+    snapshot['last_round_investment_type'] = snapshot['last_round_investment_type'].fillna('0')
+    return snapshot
+
+
+def input_fingerprint(paths):
+    # Changes whenever one of the raw csvs is replaced or modified
+    digest = hashlib.sha1(str(SNAPSHOT_VERSION).encode())
+    for path in paths:
+        info = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{info.st_mtime_ns}:{info.st_size};".encode())
+    return digest.hexdigest()[:16]
+
+
+def snapshot_cache_path(cache_dir, sim_start_date, warmup_years, sim_years, fingerprint):
+    return os.path.join(cache_dir, f"features_{pd.Timestamp(sim_start_date):%Y-%m-%d}"
+                                   f"_w{warmup_years}_s{sim_years}_{fingerprint}.parquet")
+
+
+def build_feature_snapshots(sim_start_dates,
+                            organization_path,
+                            funding_rounds_path,
+                            acquisitions_path,
+                            ipos_path,
+                            investments_path,
+                            people_path,
+                            degrees_path,
+                            warmup_years=WINDOW_YEARS,
+                            sim_years=WINDOW_YEARS,
+                            cache_dir=None):
+    # Returns {sim_start_date: cleaned feature table with 'outcome'}.
+    # With cache_dir, snapshots are stored as Parquet and the raw tables are
+    # only read if at least one requested date is not cached yet. Cached files
+    # are keyed by the windows and by the path, size and mtime of every input.
+    paths = [organization_path, funding_rounds_path, acquisitions_path, ipos_path,
+             investments_path, people_path, degrees_path]
+    fingerprint = input_fingerprint(paths) if cache_dir else None
+
+    def cache_path(sim_start_date):
+        return snapshot_cache_path(cache_dir, sim_start_date, warmup_years, sim_years, fingerprint)
+
+    snapshots = {}
+    missing = []
+    for sim_start_date in sim_start_dates:
+        sim_start_date = pd.Timestamp(sim_start_date)
+        if cache_dir and os.path.exists(cache_path(sim_start_date)):
+            snapshots[sim_start_date] = pd.read_parquet(cache_path(sim_start_date))
+        else:
+            missing.append(sim_start_date)
+
+    if missing:
+        tables = load_snapshot_tables(*paths)
+        for sim_start_date in missing:
+            logger.info(f"Building snapshot for {sim_start_date:%Y-%m-%d}")
+            snapshot = build_snapshot(tables, sim_start_date, warmup_years, sim_years)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+                snapshot.to_parquet(cache_path(sim_start_date), index=False)
+            snapshots[sim_start_date] = snapshot
+
+    return {pd.Timestamp(date): snapshots[pd.Timestamp(date)] for date in sim_start_dates}
@@ -0,0 +1,215 @@
+import io
+import os
+import pandas as pd
+
+# Chunked readers for the large tables so that callers only ever hold one
+# chunk in memory. Parquet is read one record batch at a time; CSV falls back
+# to pandas' chunksize reader. read_matching_rows() additionally drops rows
+# whose key is not in a known key set while scanning.
+#
+# pyarrow is optional and only imported when a table is read, so importing
+# this module (as the web app does) does not load it.
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def parquet_module():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow is required to read Parquet files")
+    return pq
+
+
+def read_table_columns(path):
+    if is_parquet(path):
+        return list(parquet_module().ParquetFile(path).schema_arrow.names)
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def iter_table_chunks(path, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    if is_parquet(path):
+        parquet_file = parquet_module().ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+
+
+# pandas' default missing-value strings and boolean spellings for read_csv
+NA_STRINGS = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+              '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+BOOL_STRINGS = ['True', 'TRUE', 'true', 'False', 'FALSE', 'false']
+
+
+def new_column_kind():
+    # What pd.read_csv would make of a column, from every value seen so far
+    return {'missing': False, 'int': True, 'float': True, 'bool': True, 'present': False}
+
+
+def update_column_kind(kind, missing, present, is_int, is_float, is_bool):
+    kind['missing'] |= missing
+    if present:
+        kind['present'] = True
+        kind['int'] &= is_int
+        kind['float'] &= is_float
+        kind['bool'] &= is_bool
+
+
+def update_kinds_from_strings(kinds, chunk):
+    # chunk: raw string columns read with keep_default_na=False
+    for column, values in chunk.items():
+        kind = kinds[column]
+        missing = values.isin(NA_STRINGS)
+        present = values[~missing]
+        if present.empty:
+            update_column_kind(kind, bool(missing.any()), False, True, True, True)
+            continue
+        try:
+            parsed = pd.to_numeric(present) if kind['float'] else None
+        except ValueError:
+            parsed = None
+        update_column_kind(kind, bool(missing.any()), True,
+                           parsed is not None and pd.api.types.is_integer_dtype(parsed), parsed is not None,
+                           kind['bool'] and bool(present.isin(BOOL_STRINGS).all()))
+
+
+def update_kinds_from_arrow(kinds, batch, pa, pc):
+    # Same as update_kinds_from_strings for an Arrow batch of string columns
+    na_strings = pa.array(NA_STRINGS, type=pa.string())
+    bool_strings = pa.array(BOOL_STRINGS, type=pa.string())
+    for column, values in zip(batch.schema.names, batch.columns):
+        kind = kinds[column]
+        missing = pc.is_in(values, value_set=na_strings)
+        missing_count = pc.sum(missing).as_py() or 0
+        if missing_count == len(values) or not (kind['float'] or kind['bool']):
+            # Nothing left to learn about this column but whether it has values
+            update_column_kind(kind, missing_count > 0, missing_count < len(values), False, False, False)
+            continue
+        present = values.filter(pc.invert(missing)) if missing_count else values
+        is_int = is_float = False
+        if kind['float']:
+            # A failing cast is slow on long arrays, so try a short prefix first
+            try:
+                present.slice(0, 1000).cast(pa.float64())
+                present.cast(pa.float64())
+                is_float = True
+                present.slice(0, 1000).cast(pa.int64())
+                present.cast(pa.int64())
+                is_int = True
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                pass
+        is_bool = kind['bool'] and pc.all(pc.is_in(present, value_set=bool_strings)).as_py()
+        update_column_kind(kind, missing_count > 0, True, is_int, is_float, is_bool)
+
+
+def parse_matching_rows(buffer, kinds):
+    # Parses the matching rows with the dtypes a full pd.read_csv would give
+    # the whole column, not just the rows that matched
+    dtypes = {}
+    for column, kind in kinds.items():
+        if not kind['present']:
+            dtypes[column] = 'float64'
+        elif kind['int'] and not kind['missing']:
+            dtypes[column] = 'int64'
+        elif kind['float']:
+            dtypes[column] = 'float64'
+        elif kind['bool'] and not kind['missing']:
+            dtypes[column] = 'bool'
+        elif not kind['bool']:
+            dtypes[column] = 'str'
+    frame = pd.read_csv(buffer, dtype=dtypes)
+    for column in kinds:
+        if column not in dtypes and frame[column].dtype == bool:
+            # Booleans with missing values are objects in a full read
+            frame[column] = frame[column].astype(object)
+    return frame
+
+
+def parquet_columns_with_nulls(parquet_file):
+    # Columns with nulls in any row group, from the footer statistics
+    metadata = parquet_file.metadata
+    columns = set()
+    for row_group in range(metadata.num_row_groups):
+        for i in range(metadata.num_columns):
+            column = metadata.row_group(row_group).column(i)
+            statistics = column.statistics
+            if statistics is not None and statistics.has_null_count and statistics.null_count > 0:
+                columns.add(column.path_in_schema)
+    return columns
+
+
+def read_matching_rows(path, key_column, keys, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Semi-join read: only rows whose key_column is in `keys` are returned.
+    #
+    # Parquet pushes the key set into the scan as a filter. CSV is streamed in
+    # Arrow record batches with every column kept as a string, and each batch
+    # is filtered against the key set (a hash set inside pc.is_in) before
+    # anything becomes a DataFrame. Every batch also records what kind of
+    # values each column holds (numbers, booleans, missing values), so the
+    # surviving rows are parsed by pandas with the dtypes a plain pd.read_csv
+    # of the whole file would give them. Without pyarrow the CSV is streamed
+    # through pandas the same way.
+    keys = pd.unique(pd.Series(keys).dropna().astype(str))
+
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError:
+        pa = None
+
+    if pa is None:
+        kinds = {column: new_column_kind() for column in columns or read_table_columns(path)}
+        chunks = []
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            update_kinds_from_strings(kinds, chunk)
+            chunks.append(chunk[chunk[key_column].isin(keys)])
+        buffer = io.StringIO()
+        matching = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=list(kinds))
+        matching.to_csv(buffer, index=False)
+        buffer.seek(0)
+        return parse_matching_rows(buffer, kinds)
+
+    value_set = pa.array(keys, type=pa.string())
+
+    if is_parquet(path):
+        frame = pq.read_table(path, columns=columns, filters=pc.field(key_column).isin(value_set)).to_pandas()
+        # pyarrow only turns integer and boolean columns into float and object
+        # columns when the rows it converts have nulls; match the whole file
+        nullable = parquet_columns_with_nulls(pq.ParquetFile(path))
+        for column in frame.columns:
+            dtype = frame[column].dtype
+            if column not in nullable or isinstance(dtype, pd.api.extensions.ExtensionDtype):
+                continue
+            if pd.api.types.is_integer_dtype(dtype):
+                frame[column] = frame[column].astype('float64')
+            elif dtype == bool:
+                frame[column] = frame[column].astype(object)
+        return frame
+
+    header = read_table_columns(path)
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=16 * 1024 * 1024),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in header},
+                                              include_columns=columns or [],
+                                              strings_can_be_null=False),
+    )
+    kinds = {column: new_column_kind() for column in reader.schema.names}
+    batches = []
+    for batch in reader:
+        update_kinds_from_arrow(kinds, batch, pa, pc)
+        batches.append(batch.filter(pc.is_in(batch.column(key_column), value_set=value_set)))
+    matching = pa.Table.from_batches(batches, schema=reader.schema)
+
+    buffer = io.BytesIO()
+    pa_csv.write_csv(matching, buffer)
+    buffer.seek(0)
+    return parse_matching_rows(buffer, kinds)
@@ -0,0 +1,146 @@
+import math
+import numpy as np
+
+# Successive-halving hyperparameter search for the GradientBoostingClassifier.
+#
+# The resource being halved is the number of boosting stages. Every candidate
+# starts with min_estimators trees on each CV fold. After each rung only the
+# best 1/eta of the candidates (by mean validation log loss over the folds,
+# taken at their best stage so far) move on to eta times as many trees.
+#
+# Moving up a rung never refits: the fold models use warm_start, so fit() only
+# grows the new trees, and the validation scores are carried over and extended
+# with the new trees' predictions, so every stage is scored exactly once.
+# The fold matrices are sliced and converted to float32 (the dtype the trees
+# split on) once, and one joblib pool runs the (candidate, fold) fits of a
+# rung in parallel for the whole search.
+
+PARAM_GRID = {
+    'learning_rate': [0.02, 0.05, 0.1, 0.2],
+    'max_depth': [2, 3, 4, 5],
+    'subsample': [0.6, 0.8, 1.0],
+    'min_samples_leaf': [1, 5, 20, 50],
+    'max_features': [None, 'sqrt', 0.5],
+}
+
+DEFAULT_CANDIDATES = 27
+DEFAULT_MIN_ESTIMATORS = 25
+DEFAULT_MAX_ESTIMATORS = 400
+DEFAULT_ETA = 3
+
+
+def sample_candidates(param_grid, n_candidates, random_state):
+    from sklearn.model_selection import ParameterSampler
+    return list(ParameterSampler(param_grid, n_iter=n_candidates, random_state=random_state))
+
+
+def log_loss_from_raw(raw, y):
+    # Binary deviance on decision_function scores
+    return float(np.mean(np.logaddexp(0, raw) - y * raw))
+
+
+def grow_fold_model(model, params, n_estimators, fold, raw, losses, random_state):
+    # Grows one candidate on one fold to n_estimators stages and scores the new stages
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    X_train, y_train, X_test, y_test = fold
+    if model is None:
+        model = GradientBoostingClassifier(**params, n_estimators=n_estimators, warm_start=True, random_state=random_state)
+    else:
+        model.set_params(n_estimators=n_estimators)
+    model.fit(X_train, y_train)
+
+    if raw is None:
+        raw = model._raw_predict_init(X_test)[:, 0].astype(np.float64)
+    for tree in model.estimators_[len(losses):, 0]:
+        raw += model.learning_rate * tree.predict(X_test)
+        losses.append(log_loss_from_raw(raw, y_test))
+
+    return model, raw, losses
+
+
+def successive_halving_search(X, y, cv,
+                              param_grid=PARAM_GRID,
+                              n_candidates=DEFAULT_CANDIDATES,
+                              min_estimators=DEFAULT_MIN_ESTIMATORS,
+                              max_estimators=DEFAULT_MAX_ESTIMATORS,
+                              eta=DEFAULT_ETA,
+                              n_jobs=-1,
+                              random_state=42):
+    from joblib import Parallel, delayed
+    from sklearn.metrics import roc_auc_score, precision_score, recall_score
+
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    folds = [(np.ascontiguousarray(X[train_index]), y[train_index], np.ascontiguousarray(X[test_index]), y[test_index])
+             for train_index, test_index in cv.split(X, y)]
+
+    candidates = sample_candidates(param_grid, n_candidates, random_state)
+    n_rungs = max(1, math.ceil(math.log(len(candidates), eta))) + 1
+    budgets = sorted({min(min_estimators * eta ** rung, max_estimators) for rung in range(n_rungs)} | {max_estimators})
+
+    # state[(candidate, fold)] = (model, raw validation scores, per-stage losses)
+    state = {(c, f): (None, None, []) for c in range(len(candidates)) for f in range(len(folds))}
+    alive = list(range(len(candidates)))
+    history = []
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for rung, n_estimators in enumerate(budgets):
+            keys = [(c, f) for c in alive for f in range(len(folds))]
+            results = parallel(
+                delayed(grow_fold_model)(state[key][0], candidates[key[0]], n_estimators, folds[key[1]],
+                                         state[key][1], state[key][2], random_state)
+                for key in keys
+            )
+            state.update(zip(keys, results))
+
+            scores = {}
+            for c in alive:
+                curve = np.mean([state[(c, f)][2] for f in range(len(folds))], axis=0)
+                scores[c] = (float(curve.min()), int(curve.argmin()) + 1)
+            ranked = sorted(alive, key=lambda c: scores[c][0])
+
+            history.append({
+                'rung': rung,
+                'n_estimators': n_estimators,
+                'candidates': [{'params': candidates[c], 'log_loss': scores[c][0], 'best_stage': scores[c][1]} for c in ranked],
+            })
+            print(f"Rung {rung}: {len(alive)} candidates at {n_estimators} stages, best log loss {scores[ranked[0]][0]:.4f}")
+
+            # Free the models of eliminated candidates
+            survivors = ranked[:max(1, len(ranked) // eta)] if n_estimators < budgets[-1] else ranked[:1]
+            for c in set(alive) - set(survivors):
+                for f in range(len(folds)):
+                    state[(c, f)] = None
+            alive = survivors
+
+    best = alive[0]
+    fold_curves = np.array([state[(best, f)][2] for f in range(len(folds))])
+    best_stage = int(fold_curves.mean(axis=0).argmin()) + 1
+
+    # CV metrics of the winner at its best stage
+    aucs, precisions, recalls = [], [], []
+    for f, (X_train, y_train, X_test, y_test) in enumerate(folds):
+        model = state[(best, f)][0]
+        for stage, proba in enumerate(model.staged_predict_proba(X_test), start=1):
+            if stage == best_stage:
+                break
+        aucs.append(roc_auc_score(y_test, proba[:, 1]))
+        precisions.append(precision_score(y_test, proba[:, 1] >= 0.5, zero_division=0))
+        recalls.append(recall_score(y_test, proba[:, 1] >= 0.5, zero_division=0))
+
+    fold_losses = fold_curves[:, best_stage - 1]
+    return {
+        'params': candidates[best],
+        'n_estimators': best_stage,
+        'cv_metrics': {
+            'log_loss': float(fold_losses.mean()),
+            'log_loss_std': float(fold_losses.std()),
+            'roc_auc': float(np.mean(aucs)),
+            'roc_auc_std': float(np.std(aucs)),
+            'precision': float(np.mean(precisions)),
+            'recall': float(np.mean(recalls)),
+        },
+        'fold_curves': fold_curves,
+        'history': history,
+    }
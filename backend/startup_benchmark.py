@@ -0,0 +1,84 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+# Startup-time benchmark for the web app.
+#
+# Imports Screening.py in fresh interpreters, the way a new gunicorn worker
+# would without preloading, and fails if the median import time goes over the
+# budget or if modules only needed for training or plotting get imported.
+#
+#   python backend/startup_benchmark.py --budget 2.5
+#
+# tests/test_startup.py runs the same check with the test suite.
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must stay out of the serving path
+LAZY_MODULES = ['matplotlib', 'matplotlib.pyplot', 'pyarrow.parquet', 'functions.batch_scoring', 'functions.snapshots']
+
+# Serving objects that are only set when the model artifacts load
+SERVING_OBJECTS = ['classifier', 'explainer', 'drift_monitor', 'feature_store']
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import Screening
+elapsed = time.perf_counter() - started
+ready = [name for name in %r if getattr(Screening, name, None) is not None]
+if 'feature_store' in ready and Screening.feature_store.store is None:
+    ready.remove('feature_store')
+print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules], 'ready': ready}))
+"""
+
+
+def measure_startup(runs, fast_start=True, env=None):
+    # Returns the import times, the lazy modules that got imported and the
+    # serving objects that were set up (empty when the model files are missing).
+    # env adds environment variables, e.g. SCREENING_MODEL_DIR for a test model.
+    env = dict(os.environ, **(env or {}))
+    env['SCREENING_FAST_START'] = '1' if fast_start else '0'
+
+    timings = []
+    loaded = set()
+    ready = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE % (SERVING_OBJECTS, LAZY_MODULES)], cwd=base_path, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result['seconds'])
+        loaded.update(result['loaded'])
+        ready = result['ready']
+    return timings, sorted(loaded), ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure and guard the import time of Screening.py')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=float(os.environ.get('STARTUP_BUDGET_SECONDS', 3.0)),
+                        help='Maximum median import time in seconds')
+    parser.add_argument('--no-fast-start', action='store_true', help='Measure with fast-start mode disabled')
+    args = parser.parse_args()
+
+    timings, loaded, ready = measure_startup(args.runs, fast_start=not args.no_fast_start)
+    median = statistics.median(timings)
+    print(f"Import time over {args.runs} runs: median {median:.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s")
+    if 'classifier' not in ready:
+        print("Warning: the model files are missing, so this only timed the startup without a model")
+
+    failed = False
+    if median > args.budget:
+        print(f"FAIL: median import time {median:.3f}s is over the {args.budget:.3f}s budget")
+        failed = True
+    if loaded:
+        print(f"FAIL: modules that should be imported lazily were loaded: {', '.join(loaded)}")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The backend modules import each other as 'functions.*', relative to backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.preprocessing import LabelEncoder
+
+from functions.audit_log import file_version
+from functions.categorical_encoding import FrequencyAwareEncoder
+from functions.drift import build_drift_reference
+from functions.feature_store import build_feature_store
+from functions.models import save_model_artifacts
+
+COLUMNS = ['age_months', 'num_funding_rounds', 'city']
+
+
+@pytest.fixture(scope='session')
+def serving_env(tmp_path_factory):
+    # A small trained model and feature store, so startup goes through
+    # unpickling, the TreeExplainer build and the store open
+    directory = tmp_path_factory.mktemp('serving')
+    rng = np.random.default_rng(0)
+    companies = pd.DataFrame({'uuid_org': [f'org-{i}' for i in range(300)],
+                              'age_months': rng.integers(1, 200, 300).astype(np.float64),
+                              'num_funding_rounds': rng.integers(0, 6, 300).astype(np.float64),
+                              'city': rng.choice(['SF', 'NY', 'LA', 'Austin'], 300)})
+    encoders = {'city': FrequencyAwareEncoder(min_count=1).fit(companies['city'])}
+    X = companies[COLUMNS].copy()
+    X['city'] = encoders['city'].transform(X['city'])
+    y = (X['num_funding_rounds'] + rng.normal(size=300) > 2).astype(int).to_numpy()
+    classifier = GradientBoostingClassifier(n_estimators=50, max_depth=3, random_state=0).fit(X, y)
+
+    model_dir = str(directory / 'pkls')
+    os.makedirs(model_dir)
+    save_model_artifacts(classifier, encoders, COLUMNS, LabelEncoder().fit([0, 1]),
+                         drift_reference=build_drift_reference(X, encoders), path=model_dir)
+    build_feature_store(companies, str(directory / 'feature_store'), encoders, COLUMNS,
+                        file_version(os.path.join(model_dir, 'final_model.pkl')), chunk_size=100)
+
+    return {'SCREENING_MODEL_DIR': model_dir,
+            'SCREENING_FEATURE_STORE': str(directory / 'feature_store'),
+            'SCREENING_AUDIT_DIR': str(directory / 'audit'),
+            'SCREENING_DRIFT_DIR': str(directory / 'drift')}
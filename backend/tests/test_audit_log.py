@@ -0,0 +1,175 @@
+import os
+import glob
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from functions.audit_log import AuditLog
+
+FEATURES = ['age_months', 'city']
+
+
+def audit_log(directory, **options):
+    # The writer thread never wakes up on its own, so tests control every flush
+    options = {'capacity': 4, 'batch_size': 1000, 'flush_interval': 3600, **options}
+    return AuditLog(str(directory), FEATURES, 'v1', **options)
+
+
+def record(log, values):
+    for value in values:
+        log.record([value, -value], int(value) % 2, value / 100, 1.5)
+
+
+def read_back(directory):
+    files = sorted(glob.glob(os.path.join(str(directory), '*.parquet')))
+    if not files:
+        return pd.DataFrame()
+    frame = pd.concat([pd.read_parquet(path) for path in files], ignore_index=True)
+    return frame.sort_values('timestamp', kind='stable', ignore_index=True)
+
+
+def test_drop_oldest_keeps_the_newest_records(tmp_path):
+    log = audit_log(tmp_path, overflow='drop_oldest')
+    record(log, range(6))
+
+    stats = log.stats()
+    assert stats['recorded'] == 6 and stats['dropped'] == 2 and stats['pending'] == 4
+    log.close()
+    assert read_back(tmp_path)['age_months'].tolist() == [2, 3, 4, 5]
+
+
+def test_drop_newest_keeps_the_oldest_records(tmp_path):
+    log = audit_log(tmp_path, overflow='drop_newest')
+    record(log, range(6))
+
+    stats = log.stats()
+    assert stats['recorded'] == 4 and stats['dropped'] == 2 and stats['pending'] == 4
+    log.close()
+    assert read_back(tmp_path)['age_months'].tolist() == [0, 1, 2, 3]
+
+
+def test_drain_wraps_around_the_ring_buffer(tmp_path):
+    log = audit_log(tmp_path)
+    record(log, [0, 1, 2])
+    assert log.drain()[1][:, 0].tolist() == [0, 1, 2]
+
+    # Slots 3, 0 and 1: the second batch wraps past the end of the arrays
+    record(log, [3, 4, 5])
+    timestamps, features, predictions, confidences, latencies = log.drain()
+    assert features.tolist() == [[3, -3], [4, -4], [5, -5]]
+    assert predictions.tolist() == [1, 0, 1]
+    assert confidences.tolist() == [0.03, 0.04, 0.05]
+    assert (np.diff(timestamps) >= 0).all()
+    assert log.drain() is None
+    assert log.stats()['dropped'] == 0
+
+
+def test_open_file_is_renamed_once_it_is_old_enough(tmp_path):
+    log = audit_log(tmp_path, max_file_seconds=0.2)
+    record(log, [0, 1, 2])
+    log.flush()
+
+    # Still open: unreadable .inprogress file, rows not counted as written yet
+    assert glob.glob(str(tmp_path / '*.parquet')) == []
+    assert len(glob.glob(str(tmp_path / '*.parquet.inprogress'))) == 1
+    stats = log.stats()
+    assert stats['written'] == 0 and stats['in_open_file'] == 3 and stats['pending'] == 0
+
+    time.sleep(0.25)
+    # An idle flush closes the file on time
+    log.flush()
+    assert glob.glob(str(tmp_path / '*.parquet.inprogress')) == []
+    stats = log.stats()
+    assert stats['written'] == 3 and stats['in_open_file'] == 0
+
+    # The next batch starts a new file
+    record(log, [3])
+    log.flush()
+    assert log.stats()['in_open_file'] == 1
+    log.close()
+    assert len(glob.glob(str(tmp_path / '*.parquet'))) == 2
+    assert log.stats()['written'] == 4
+    assert read_back(tmp_path)['age_months'].tolist() == [0, 1, 2, 3]
+
+
+def test_file_is_closed_after_max_rows_per_file(tmp_path):
+    log = audit_log(tmp_path, max_rows_per_file=2)
+    record(log, [0, 1])
+    log.flush()
+    assert glob.glob(str(tmp_path / '*.parquet.inprogress')) == []
+    assert log.stats()['written'] == 2
+
+
+def test_parquet_rows_schema_and_model_version(tmp_path):
+    log = audit_log(tmp_path, capacity=16)
+    record(log, [1, 2, 3])
+    log.flush()
+    record(log, [4])
+    log.close()
+
+    files = glob.glob(str(tmp_path / '*.parquet'))
+    assert len(files) == 1
+    schema = pq.read_schema(files[0])
+    assert schema.names == ['timestamp', 'model_version', 'prediction', 'confidence', 'latency_ms'] + FEATURES
+    assert schema.field('timestamp').type == pa.timestamp('us', tz='UTC')
+    assert schema.field('model_version').type == pa.string()
+    assert schema.field('prediction').type == pa.int8()
+    assert all(schema.field(name).type == pa.float64() for name in ['confidence', 'latency_ms'] + FEATURES)
+    # One row group per flush
+    assert pq.ParquetFile(files[0]).num_row_groups == 2
+
+    frame = read_back(tmp_path)
+    assert frame['model_version'].tolist() == ['v1'] * 4
+    assert frame['age_months'].tolist() == [1, 2, 3, 4]
+    assert frame['city'].tolist() == [-1, -2, -3, -4]
+    assert frame['prediction'].tolist() == [1, 0, 1, 0]
+    assert frame['confidence'].tolist() == [0.01, 0.02, 0.03, 0.04]
+    assert frame['latency_ms'].tolist() == [1.5] * 4
+    assert log.stats()['written'] == 4
+
+
+def test_writer_restarts_in_a_forked_child(tmp_path):
+    log = audit_log(tmp_path)
+    record(log, [0, 1, 2])
+    parent_writer = log.writer
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: the first record() sees a new pid and starts its own writer
+        status = 1
+        try:
+            record(log, [7])
+            stats = log.stats()
+            if (log.writer is not parent_writer and log.writer_pid == os.getpid() and
+                    stats['recorded'] == 1 and stats['pending'] == 1):
+                log.close()
+                status = 0
+        finally:
+            os.write(write_end, bytes([status]))
+            os._exit(0)
+
+    os.close(write_end)
+    assert os.read(read_end, 1) == bytes([0])
+    os.waitpid(pid, 0)
+
+    # The child wrote only its own record, to its own file
+    child_files = glob.glob(str(tmp_path / f'audit-{pid}-*.parquet'))
+    assert len(child_files) == 1
+    assert pd.read_parquet(child_files[0])['age_months'].tolist() == [7]
+
+    # The parent's records and writer are untouched
+    assert log.writer is parent_writer and log.writer_pid == os.getpid()
+    assert log.stats()['pending'] == 3
+    log.close()
+    parent_files = glob.glob(str(tmp_path / f'audit-{os.getpid()}-*.parquet'))
+    assert len(parent_files) == 1
+    assert pd.read_parquet(parent_files[0])['age_months'].tolist() == [0, 1, 2]
+
+
+def test_close_is_a_no_op_in_a_process_that_never_recorded(tmp_path):
+    log = audit_log(tmp_path)
+    log.close()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,142 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.preprocessing import LabelEncoder
+
+from functions.batch_scoring import (plan_csv_shards, read_shard, build_feature_matrix, score_frame, score_file,
+                                     starts_a_record, csv_fields, shard_output_path)
+from functions.categorical_encoding import FrequencyAwareEncoder
+from functions.models import save_model_artifacts
+
+COLUMNS = ['age_months', 'has_facebook_url', 'city']
+
+
+def companies(rows):
+    return pd.DataFrame({
+        'uuid_org': [f'org{i}' for i in range(rows)],
+        'city': ['SF', 'NY'] * (rows // 2),
+        'age_months': pd.array([i if i < rows // 2 else None for i in range(rows)], dtype='Int64'),
+        'has_facebook_url': [i % 3 == 0 for i in range(rows)],
+    })
+
+
+def with_descriptions(frame):
+    # Every third description spans lines, so some boundaries land inside one
+    frame['short_description'] = ['first line\nsecond "quoted" line\nthird line' if i % 3 == 0 else 'one line'
+                                  for i in range(len(frame))]
+    return frame
+
+
+def test_shards_cover_the_file_and_read_every_column_as_strings(tmp_path):
+    path = str(tmp_path / 'companies.csv')
+    companies(400).to_csv(path, index=False)
+
+    shards = plan_csv_shards(path, shard_bytes=1000)
+    assert len(shards) > 4
+    frames = [read_shard(path, shard) for shard in shards]
+    # Ages would be int64 in the first shards and float64 once they go missing
+    assert all(frame.dtypes.equals(frames[0].dtypes) for frame in frames)
+    pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), pd.read_csv(path, dtype=str))
+
+
+def test_boundaries_inside_quoted_fields_move_to_the_next_record(tmp_path):
+    path = str(tmp_path / 'companies.csv')
+    frame = with_descriptions(companies(400))
+    frame.to_csv(path, index=False)
+
+    shards = plan_csv_shards(path, shard_bytes=1000)
+    assert len(shards) > 4
+    with open(path, 'rb') as file:
+        num_columns = len(csv_fields(file.readline()))
+        for shard in shards[1:]:
+            file.seek(shard['start'])
+            assert starts_a_record(file.readline(), num_columns)
+    frames = [read_shard(path, shard) for shard in shards]
+    pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), pd.read_csv(path, dtype=str))
+
+
+def test_a_file_that_is_one_quoted_field_is_one_shard(tmp_path):
+    path = str(tmp_path / 'companies.csv')
+    frame = companies(4)
+    frame['short_description'] = ['x'] * 3 + ['\n'.join(['line'] * 500)]
+    frame.to_csv(path, index=False)
+
+    shards = plan_csv_shards(path, shard_bytes=100)
+    assert len(shards) == 1
+    pd.testing.assert_frame_equal(pd.concat([read_shard(path, shard) for shard in shards], ignore_index=True),
+                                  pd.read_csv(path, dtype=str))
+
+
+def test_read_shard_only_reads_the_requested_columns(tmp_path):
+    frame = companies(10)
+    csv_path = str(tmp_path / 'companies.csv')
+    parquet_path = str(tmp_path / 'companies.parquet')
+    frame.to_csv(csv_path, index=False)
+    frame.to_parquet(parquet_path, index=False)
+
+    columns = ['uuid_org', 'name_org', 'age_months']
+    csv_frame = read_shard(csv_path, plan_csv_shards(csv_path, 1 << 20)[0], columns)
+    parquet_frame = read_shard(parquet_path, {'row_group': 0}, columns)
+    assert list(csv_frame.columns) == list(parquet_frame.columns) == ['uuid_org', 'age_months']
+
+
+def test_blank_and_malformed_values_become_zero():
+    strings = pd.DataFrame({'age_months': ['3.5', '', None, 'n/a', '12'],
+                            'has_facebook_url': ['True', 'false', '', 'yes', 'FALSE']}, dtype=str)
+    typed = pd.DataFrame({'age_months': pd.array([3.5, None, None, None, 12]),
+                          'has_facebook_url': pd.array([True, False, None, None, False], dtype='boolean')})
+    expected = np.array([[3.5, 1], [0, 0], [0, 0], [0, 0], [12, 0]])
+
+    np.testing.assert_array_equal(build_feature_matrix(strings, {}, ['age_months', 'has_facebook_url']), expected)
+    np.testing.assert_array_equal(build_feature_matrix(typed, {}, ['age_months', 'has_facebook_url']), expected)
+    plain = pd.DataFrame({'has_facebook_url': [True, False]})
+    np.testing.assert_array_equal(build_feature_matrix(plain, {}, ['has_facebook_url'])[:, 0], [1, 0])
+
+
+def save_tiny_model(directory):
+    frame = companies(200)
+    encoders = {'city': FrequencyAwareEncoder(min_count=1).fit(frame['city'])}
+    X = build_feature_matrix(frame, encoders, COLUMNS)
+    y = (frame['has_facebook_url'] | (frame['city'] == 'SF')).to_numpy().astype(int)
+    classifier = GradientBoostingClassifier(n_estimators=10, max_depth=2, random_state=0).fit(X, y)
+    save_model_artifacts(classifier, encoders, COLUMNS, LabelEncoder().fit(['closed', 'funded']), path=directory)
+    return classifier, encoders
+
+
+def read_scores(output_dir):
+    return pd.concat([pd.read_parquet(path) for path in sorted(glob.glob(os.path.join(output_dir, 'part-*.parquet')))],
+                     ignore_index=True)
+
+
+def test_score_file_resumes_after_losing_a_shard(tmp_path):
+    model_path = str(tmp_path / 'pkls')
+    os.makedirs(model_path)
+    classifier, encoders = save_tiny_model(model_path)
+
+    path = str(tmp_path / 'companies.csv')
+    frame = with_descriptions(companies(300))
+    frame['total_funding_usd'] = 'unused'
+    frame.to_csv(path, index=False)
+    # A blank boolean and a malformed number deep in the file
+    with open(path, 'a') as file:
+        file.write('org300,LA,not a number,,one line,1\n')
+
+    output_dir = str(tmp_path / 'scores')
+    score_file(path, output_dir, workers=2, shard_bytes=1500, model_path=model_path)
+    scores = read_scores(output_dir)
+    expected = score_frame(pd.read_csv(path, dtype=str), classifier, encoders, COLUMNS)
+    pd.testing.assert_frame_equal(scores, expected)
+    assert scores['uuid_org'].iloc[-1] == 'org300'
+
+    parts = sorted(glob.glob(os.path.join(output_dir, 'part-*.parquet')))
+    assert len(parts) > 3
+    modified = {part: os.stat(part).st_mtime_ns for part in parts}
+    os.remove(shard_output_path(output_dir, 2))
+
+    score_file(path, output_dir, workers=2, shard_bytes=1500, model_path=model_path)
+    assert sorted(glob.glob(os.path.join(output_dir, 'part-*.parquet'))) == parts
+    # Only the missing shard was scored again
+    assert [part for part in parts if os.stat(part).st_mtime_ns != modified[part]] == [shard_output_path(output_dir, 2)]
+    pd.testing.assert_frame_equal(read_scores(output_dir), expected)
@@ -0,0 +1,120 @@
+import os
+import sys
+import pickle
+import subprocess
+import threading
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from functions.categorical_encoding import FrequencyAwareEncoder
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CITIES = ['SF'] * 5 + ['NY'] * 3 + ['LA'] * 2 + ['Boise']
+
+
+def fitted():
+    return FrequencyAwareEncoder(min_count=2, num_buckets=8).fit(CITIES)
+
+
+def test_unseen_values_get_the_same_code_in_fresh_interpreters(tmp_path):
+    path = str(tmp_path / 'encoder.pkl')
+    with open(path, 'wb') as file:
+        pickle.dump(fitted(), file)
+
+    unseen = ['Reykjavik', 'Boise', 'São Paulo', '']
+    script = ("import pickle, sys\n"
+              f"encoder = pickle.load(open({path!r}, 'rb'))\n"
+              f"print([encoder.encode(value) for value in {unseen!r}])\n")
+    outputs = []
+    for seed in ['1', '2']:
+        # Different hash seeds: codes must not depend on hash()
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        outputs.append(subprocess.run([sys.executable, '-c', script], cwd=BACKEND, env=env,
+                                      capture_output=True, text=True, check=True).stdout)
+    assert outputs[0] == outputs[1] == f"{[fitted().encode(value) for value in unseen]}\n"
+
+
+def test_codes_stay_in_range_and_the_encoder_never_grows():
+    encoder = fitted()
+    classes, table = list(encoder.classes_), dict(encoder.table)
+
+    values = [f'city-{i}' for i in range(1000)] + CITIES
+    codes = [encoder.encode(value) for value in values]
+    transformed = encoder.transform(values)
+
+    assert all(0 <= code < encoder.num_codes for code in codes)
+    assert transformed.min() >= 0 and transformed.max() < encoder.num_codes
+    np.testing.assert_array_equal(transformed, codes)
+    assert list(encoder.classes_) == classes and encoder.table == table
+    assert encoder.num_codes == 3 + 8
+
+
+def test_rare_training_values_go_to_overflow_buckets():
+    encoder = fitted()
+    assert list(encoder.classes_) == ['LA', 'NY', 'SF']
+    assert [encoder.encode(value) for value in ['LA', 'NY', 'SF']] == [0, 1, 2]
+    # Seen once in training, below min_count
+    assert 'Boise' not in encoder.table
+    assert encoder.encode('Boise') == encoder.overflow_code('Boise') >= 3
+    assert encoder.rare_fraction_ == 1 / len(CITIES)
+
+
+def test_fit_counts_over_chunks_matches_fit():
+    values = pd.Series(CITIES * 3 + ['Austin', 'Austin'])
+    counts = pd.Series(dtype=np.int64)
+    for start in range(0, len(values), 4):
+        counts = counts.add(values[start:start + 4].value_counts(), fill_value=0)
+
+    chunked = FrequencyAwareEncoder(min_count=3, num_buckets=8).fit_counts(counts)
+    whole = FrequencyAwareEncoder(min_count=3, num_buckets=8).fit(values)
+    assert list(chunked.classes_) == list(whole.classes_)
+    assert chunked.table == whole.table
+    assert chunked.rare_fraction_ == whole.rare_fraction_
+    probe = ['SF', 'Austin', 'Boise', 'Nowhere']
+    np.testing.assert_array_equal(chunked.transform(probe), whole.transform(probe))
+
+
+def test_from_label_encoder_keeps_the_old_codes():
+    label_encoder = LabelEncoder().fit(CITIES)
+    encoder = FrequencyAwareEncoder.from_label_encoder(label_encoder, num_buckets=8)
+
+    np.testing.assert_array_equal(encoder.transform(CITIES), label_encoder.transform(CITIES))
+    assert encoder.encode('Boise') == int(label_encoder.transform(['Boise'])[0])
+    assert len(label_encoder.classes_) <= encoder.encode('Reykjavik') < encoder.num_codes
+
+
+def test_unseen_report_counts_requests_and_unseen_values():
+    encoder = fitted()
+    for value in ['SF', 'NY', 'Boise', 'Reykjavik', 'SF']:
+        encoder.encode(value)
+    assert encoder.unseen_report() == {'requests': 5, 'unseen': 2, 'unseen_rate': 0.4,
+                                       'training_rare_rate': 1 / len(CITIES)}
+
+    # transform() is the batch path and is not counted
+    encoder.transform(['Reykjavik'] * 10)
+    assert encoder.unseen_report()['requests'] == 5
+
+    # Counters are per process: they start from zero after unpickling
+    restored = pickle.loads(pickle.dumps(encoder))
+    assert restored.unseen_report()['requests'] == 0
+    assert restored.encode('Reykjavik') == encoder.encode('Reykjavik')
+
+    encoder.reset_counts()
+    assert encoder.unseen_report()['unseen_rate'] == 0.0
+
+
+def test_counts_are_exact_across_threads():
+    encoder = fitted()
+
+    def encode_many():
+        for i in range(5000):
+            encoder.encode('SF' if i % 2 else f'unseen-{i}')
+
+    threads = [threading.Thread(target=encode_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report = encoder.unseen_report()
+    assert report['requests'] == 40000 and report['unseen'] == 20000
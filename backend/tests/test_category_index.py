@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions.category_index import build_category_index, split_categories
+
+CATEGORY_LISTS = [
+    'SaaS, Artificial Intelligence',
+    'saas,FinTech',
+    'FinTech, Payments, FinTech',
+    None,
+    '',
+    'Artificial Intelligence,SaaS, Health Care',
+    'SaaS',
+]
+
+
+@pytest.fixture
+def index():
+    return build_category_index(pd.DataFrame({'category_list': CATEGORY_LISTS}))
+
+
+def test_split_categories_keeps_the_spelling():
+    assert split_categories(' SaaS ,, FinTech,') == ['SaaS', 'FinTech']
+    assert split_categories(None) == [] and split_categories(float('nan')) == []
+
+
+@pytest.mark.parametrize('categories,match,expected', [
+    (['saas'], 'all', [0, 1, 5, 6]),
+    (['SAAS', 'artificial intelligence'], 'all', [0, 5]),
+    (['SaaS', 'FinTech'], 'all', [1]),
+    (['SaaS', 'FinTech'], 'any', [0, 1, 2, 5, 6]),
+    (['Payments', 'Health Care'], 'any', [2, 5]),
+    # Unknown categories have empty postings
+    (['SaaS', 'Robotics'], 'all', []),
+    (['Robotics'], 'all', []),
+    (['Robotics', 'Payments'], 'any', [2]),
+    (['Robotics', 'Space'], 'any', []),
+    ([], 'all', [0, 1, 2, 3, 4, 5, 6]),
+])
+def test_filter(index, categories, match, expected):
+    rows = index.filter(categories, match)
+    assert rows.tolist() == expected
+    assert rows.dtype == np.int32
+
+
+def test_filter_rejects_unknown_match_modes(index):
+    with pytest.raises(ValueError):
+        index.filter(['SaaS'], 'some')
+
+
+def test_filter_matches_a_substring_scan(index):
+    frame = pd.DataFrame({'category_list': CATEGORY_LISTS})
+    lowered = frame['category_list'].map(lambda value: [c.lower() for c in split_categories(value)])
+    for categories in (['saas'], ['fintech', 'payments'], ['saas', 'health care']):
+        expected_all = [i for i, row in enumerate(lowered) if all(c in row for c in categories)]
+        expected_any = [i for i, row in enumerate(lowered) if any(c in row for c in categories)]
+        assert index.filter(categories, 'all').tolist() == expected_all
+        assert index.filter(categories, 'any').tolist() == expected_any
+
+
+def test_duplicate_categories_in_a_row_count_once(index):
+    assert index.rows_for('fintech').tolist() == [1, 2]
+    assert index.facet_counts()['FinTech'] == 2
+    assert index.facet_counts(index.filter(['Payments']))['FinTech'] == 1
+
+
+def test_facets_use_the_most_common_spelling(index):
+    # 'SaaS' three times, 'saas' once
+    assert sorted(index.facet_counts()) == ['Artificial Intelligence', 'FinTech', 'Health Care', 'Payments', 'SaaS']
+    assert index.rows_for('SAAS').tolist() == index.rows_for('saas').tolist() == [0, 1, 5, 6]
+
+
+def test_facet_counts_without_a_selection(index):
+    assert index.facet_counts() == {'SaaS': 4, 'Artificial Intelligence': 2, 'FinTech': 2,
+                                    'Health Care': 1, 'Payments': 1}
+    # Largest first, ties in category order
+    assert list(index.facet_counts(top=3)) == ['SaaS', 'Artificial Intelligence', 'FinTech']
+
+
+def test_facet_counts_for_a_selection(index):
+    rows = index.filter(['SaaS'], 'all')
+    assert index.facet_counts(rows) == {'SaaS': 4, 'Artificial Intelligence': 2, 'FinTech': 1, 'Health Care': 1}
+    assert index.facet_counts(rows, top=1) == {'SaaS': 4}
+    # Categories with no selected rows are left out
+    assert index.facet_counts(index.filter(['Robotics'])) == {}
+
+
+def test_empty_column():
+    index = build_category_index(pd.DataFrame({'category_list': [None, '']}))
+    assert index.filter(['SaaS']).tolist() == []
+    assert index.filter(['SaaS'], 'any').tolist() == []
+    assert index.facet_counts() == {}
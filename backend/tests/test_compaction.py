@@ -0,0 +1,98 @@
+import copy
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+
+from functions.models import compact_model, remove_unused_features, truncate_ensemble
+
+COLUMNS = ['constant_a', 'signal', 'constant_b', 'noise', 'constant_c']
+STAGES = 20
+
+
+def training_frame(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    signal = rng.normal(size=rows)
+    X = pd.DataFrame({'constant_a': 1.0, 'signal': signal, 'constant_b': 0.0,
+                      'noise': rng.normal(size=rows), 'constant_c': -3.0})
+    y = (signal + 0.5 * rng.normal(size=rows) > 0).astype(int)
+    return X[COLUMNS], y
+
+
+def fitted(X, y, **params):
+    return GradientBoostingClassifier(n_estimators=STAGES, max_depth=2, random_state=0, **params).fit(X, y)
+
+
+def fold_curves(curve):
+    # Two folds whose mean is the given curve
+    curve = np.asarray(curve)
+    return [curve - 0.01, curve + 0.01]
+
+
+# Best loss 0.5 at stage 5; stages 3 and 4 are within 5% and 0.5% of it
+CURVE = [1.0, 0.6, 0.52, 0.502, 0.5, 0.501] + [0.51] * (STAGES - 6)
+
+
+@pytest.mark.parametrize('loss_tolerance,expected_stages', [(0.0, 5), (0.005, 4), (0.05, 3), (1.0, 1)])
+def test_compaction_keeps_the_fewest_stages_within_tolerance(loss_tolerance, expected_stages):
+    X, y = training_frame()
+    classifier, kept, report = compact_model(fitted(X, y), COLUMNS, fold_curves(CURVE), X,
+                                             loss_tolerance=loss_tolerance)
+
+    assert len(classifier.estimators_) == expected_stages
+    assert classifier.n_estimators_ == expected_stages and len(classifier.train_score_) == expected_stages
+    assert report['after']['stages'] == expected_stages
+    assert report['after']['cv_log_loss'] == pytest.approx(CURVE[expected_stages - 1])
+    assert report['after']['cv_log_loss'] <= min(CURVE) * (1 + loss_tolerance)
+
+
+def test_compaction_is_skipped_when_the_curves_are_too_short():
+    X, y = training_frame()
+    classifier = fitted(X, y)
+    compacted, kept, report = compact_model(classifier, COLUMNS, fold_curves(CURVE[:5]), X)
+    assert report is None and kept == COLUMNS and len(compacted.estimators_) == STAGES
+
+
+@pytest.mark.parametrize('params', [{}, {'max_features': 3}, {'subsample': 0.8}])
+def test_compacted_model_predicts_like_the_truncated_model(params):
+    X, y = training_frame()
+    classifier = fitted(X, y, **params)
+    truncated = copy.deepcopy(classifier)
+    truncate_ensemble(truncated, 4)
+
+    compacted, kept, report = compact_model(classifier, COLUMNS, fold_curves(CURVE), X)
+
+    # No tree can split on a constant column
+    assert {'constant_a', 'constant_b', 'constant_c'} <= set(report['dropped_features'])
+    assert kept == [column for column in COLUMNS if column not in report['dropped_features']]
+    assert 'signal' in kept
+    assert list(compacted.feature_names_in_) == kept and compacted.n_features_in_ == len(kept)
+    for tree in compacted.estimators_[:, 0]:
+        assert tree.tree_.n_features == len(kept)
+        assert tree.tree_.feature.max() < len(kept)
+
+    np.testing.assert_array_equal(compacted.predict_proba(X[kept]), truncated.predict_proba(X))
+    np.testing.assert_array_equal(compacted.decision_function(X[kept]), truncated.decision_function(X))
+
+
+def test_compacted_model_survives_a_pickle_round_trip():
+    X, y = training_frame()
+    compacted, kept, report = compact_model(fitted(X, y), COLUMNS, fold_curves(CURVE), X)
+
+    restored = pickle.loads(pickle.dumps(compacted))
+    assert list(restored.feature_names_in_) == kept
+    assert [tree.tree_.n_features for tree in restored.estimators_[:, 0]] == [len(kept)] * len(restored.estimators_)
+    np.testing.assert_array_equal(restored.predict_proba(X[kept]), compacted.predict_proba(X[kept]))
+    assert report['after']['size_bytes'] < report['before']['size_bytes']
+
+
+def test_remove_unused_features_is_a_no_op_when_every_feature_is_used():
+    X, y = training_frame()
+    X = X[['signal', 'noise']]
+    classifier = fitted(X, y)
+    expected = classifier.predict_proba(X)
+
+    assert remove_unused_features(classifier, ['signal', 'noise']) == ['signal', 'noise']
+    assert classifier.n_features_in_ == 2
+    np.testing.assert_array_equal(classifier.predict_proba(X), expected)
@@ -0,0 +1,103 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions.categorical_encoding import FrequencyAwareEncoder
+from functions.drift import build_drift_reference, DriftMonitor
+
+COLUMNS = ['amount', 'city']
+
+
+@pytest.fixture
+def encoders():
+    return {'city': FrequencyAwareEncoder(min_count=2, num_buckets=4).fit(['SF', 'SF', 'NY', 'NY', 'LA'])}
+
+
+def training_features(encoders):
+    rng = np.random.default_rng(0)
+    amount = rng.normal(size=200)
+    amount[:10] = np.nan
+    amount[10:15] = np.inf
+    amount[15:20] = -np.inf
+    return pd.DataFrame({'amount': amount, 'city': encoders['city'].transform(rng.choice(['SF', 'NY', 'LA'], 200))},
+                        columns=COLUMNS)
+
+
+def test_update_bins_like_the_reference(encoders):
+    X = training_features(encoders)
+    reference = build_drift_reference(X, encoders, num_bins=5)
+    numeric = reference['features'][0]
+    assert numeric['labels'][-1] == '(missing)' and numeric['counts'][-1] == 10
+
+    # Values sitting exactly on the edges must also agree
+    X.loc[20:20 + len(numeric['edges']) - 1, 'amount'] = numeric['edges']
+    reference = build_drift_reference(X, encoders, num_bins=5)
+    monitor = DriftMonitor(reference, COLUMNS, encoders)
+    for row in X.to_numpy(dtype=np.float64):
+        monitor.update(row)
+
+    np.testing.assert_array_equal(monitor.state()['counts'], monitor.reference_counts)
+    report = monitor.report()
+    assert report['rows'] == len(X)
+    assert all(entry['psi'] < 1e-9 for entry in report['features'].values())
+
+
+def test_old_references_get_a_missing_bin(encoders):
+    reference = build_drift_reference(training_features(encoders), encoders, num_bins=5)
+    numeric = reference['features'][0]
+    numeric['counts'] = numeric['counts'][:-1]
+    numeric['labels'] = numeric['labels'][:-1]
+
+    monitor = DriftMonitor(reference, COLUMNS, encoders)
+    monitor.update(np.array([np.nan, 0.0]))
+    assert monitor.report()['features']['amount']['bins'][-1] == {'bin': '(missing)', 'live': 1.0, 'reference': 0.0}
+
+
+def test_counts_cover_the_current_and_previous_window(encoders):
+    monitor = DriftMonitor(build_drift_reference(training_features(encoders), encoders), COLUMNS, encoders, window=60)
+    row = np.array([0.0, 0.0])
+    monitor.update(row)
+    encoders['city'].encode('Atlantis')
+
+    monitor.window_started -= 60
+    monitor.update(row)
+    state = monitor.state()
+    assert state['rows'] == 2
+    assert state['unseen'].tolist() == [1]
+
+    monitor.window_started -= 60
+    assert monitor.state()['rows'] == 1
+    assert monitor.state()['unseen'].tolist() == [0]
+
+    monitor.window_started -= 120
+    assert monitor.state()['rows'] == 0
+
+
+def test_only_live_states_of_the_same_model_and_boot_are_merged(tmp_path, encoders):
+    reference = build_drift_reference(training_features(encoders), encoders)
+    directory = str(tmp_path)
+
+    def monitor(model_version='v1', boot_id='boot1'):
+        return DriftMonitor(reference, COLUMNS, encoders, directory=directory, publish_interval=3600,
+                            model_version=model_version, boot_id=boot_id)
+
+    live = monitor()
+    live.start_publisher()
+    live.update(np.array([0.0, 0.0]))
+
+    # Files published by other workers: one live, one dead, one per other model and boot
+    np.savez(os.path.join(directory, 'drift-v1-boot1-1.npz'), **live.state())
+    np.savez(os.path.join(directory, 'drift-v1-boot1-2.npz'), **live.state())
+    os.utime(os.path.join(directory, 'drift-v1-boot1-2.npz'), (0, 0))
+    np.savez(os.path.join(directory, 'drift-v0-boot1-3.npz'), **live.state())
+    np.savez(os.path.join(directory, 'drift-v1-boot0-4.npz'), **live.state())
+
+    report = live.report()
+    assert report['states'] == 2 and report['rows'] == 2
+    assert not os.path.exists(os.path.join(directory, 'drift-v1-boot1-2.npz'))
+
+    live.publish()
+    assert os.path.exists(live.state_path(os.getpid()))
+    live.remove_state()
+    assert not os.path.exists(live.state_path(os.getpid()))
@@ -0,0 +1,83 @@
+from itertools import combinations
+from math import factorial
+
+import numpy as np
+import pytest
+
+from functions.explain import TreeExplainer
+
+NUM_FEATURES = 4
+
+
+def subtree_value(tree, node, x, known):
+    # Path-dependent expectation: known features follow x, unknown ones
+    # average both children by training cover
+    left, right = tree.children_left[node], tree.children_right[node]
+    if left == -1:
+        return tree.value[node, 0, 0]
+    feature = tree.feature[node]
+    if feature in known:
+        return subtree_value(tree, left if x[feature] <= tree.threshold[node] else right, x, known)
+    cover = tree.weighted_n_node_samples
+    return (cover[left] * subtree_value(tree, left, x, known)
+            + cover[right] * subtree_value(tree, right, x, known)) / cover[node]
+
+
+def brute_force_shapley(tree, x):
+    # Shapley values straight from the definition, over every feature subset
+    phi = np.zeros(NUM_FEATURES)
+    for i in range(NUM_FEATURES):
+        others = [j for j in range(NUM_FEATURES) if j != i]
+        for size in range(NUM_FEATURES):
+            weight = factorial(size) * factorial(NUM_FEATURES - size - 1) / factorial(NUM_FEATURES)
+            for subset in combinations(others, size):
+                phi[i] += weight * (subtree_value(tree, 0, x, set(subset) | {i}) - subtree_value(tree, 0, x, set(subset)))
+    return phi
+
+
+@pytest.fixture(scope='module')
+def model():
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    rng = np.random.default_rng(0)
+    # Rounded so no value sits on a float32 split threshold
+    X = np.round(rng.normal(size=(300, NUM_FEATURES)), 2)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + 0.5 * rng.normal(size=300) > 0).astype(int)
+    classifier = GradientBoostingClassifier(n_estimators=8, max_depth=3, subsample=0.8, random_state=0).fit(X, y)
+    return classifier, X[:25]
+
+
+def test_matches_brute_force_shapley_values(model):
+    classifier, X = model
+    explainer = TreeExplainer(classifier, [f'f{i}' for i in range(NUM_FEATURES)])
+
+    expected = np.array([
+        sum(classifier.learning_rate * brute_force_shapley(tree.tree_, x) for tree in classifier.estimators_[:, 0])
+        for x in X.astype(np.float32)
+    ])
+    np.testing.assert_allclose(explainer.shap_values(X), expected, atol=1e-10)
+
+
+def test_contributions_add_up_to_the_decision_function(model):
+    classifier, X = model
+    explainer = TreeExplainer(classifier, [f'f{i}' for i in range(NUM_FEATURES)])
+
+    totals = explainer.base_value + explainer.shap_values(X).sum(axis=1)
+    np.testing.assert_allclose(totals, classifier.decision_function(X), atol=1e-10)
+
+    contributions = explainer.explain(X[:1])[0]
+    assert sorted(contributions) == [f'f{i}' for i in range(NUM_FEATURES)]
+    assert explainer.base_value + sum(contributions.values()) == pytest.approx(classifier.decision_function(X[:1])[0])
+
+
+def test_row_blocks_fit_the_byte_budget_and_give_the_same_values(model):
+    from functions.explain import BLOCK_BYTES, BLOCK_ARRAYS
+
+    classifier, X = model
+    explainer = TreeExplainer(classifier, [f'f{i}' for i in range(NUM_FEATURES)])
+    largest = max(group['features'].size for group in explainer.groups)
+    assert explainer.row_block * BLOCK_ARRAYS * 8 * largest <= BLOCK_BYTES
+
+    expected = explainer.shap_values(X)
+    explainer.row_block = 4
+    np.testing.assert_allclose(explainer.shap_values(X), expected, atol=1e-12)
@@ -0,0 +1,80 @@
+import os
+import numpy as np
+import pandas as pd
+
+from functions.categorical_encoding import FrequencyAwareEncoder
+from functions.feature_store import (build_hash_table, build_feature_store, open_feature_store,
+                                     LiveFeatureStore, uuid_keys, current_version)
+
+COLUMNS = ['age_months', 'city']
+
+
+def lookup(table_keys, table_rows, key):
+    # Same probing as FeatureStore.row_index, on raw keys
+    mask = len(table_rows) - 1
+    slot = int(key[0]) & mask
+    while table_rows[slot] != -1:
+        if (table_keys[slot] == key).all():
+            return int(table_rows[slot])
+        slot = (slot + 1) & mask
+    return None
+
+
+def test_colliding_keys_probe_to_their_own_rows():
+    # Every key has home slot 15, the last one, so probing wraps around
+    keys = np.array([[15 + 16 * i, i] for i in range(7)], dtype=np.uint64)
+    keys = np.concatenate([keys, keys[:2]])
+    table_keys, table_rows = build_hash_table(keys)
+
+    assert len(table_rows) == 32
+    assert sorted(table_rows[table_rows >= 0]) == list(range(7))
+    # Duplicates resolve to their first row
+    assert [lookup(table_keys, table_rows, key) for key in keys] == [0, 1, 2, 3, 4, 5, 6, 0, 1]
+    assert lookup(table_keys, table_rows, np.array([15, 99], dtype=np.uint64)) is None
+    assert lookup(table_keys, table_rows, np.array([14, 0], dtype=np.uint64)) is None
+
+
+def companies(rows):
+    return pd.DataFrame({'uuid_org': [f'org-{i}' for i in range(rows)],
+                         'age_months': np.arange(rows, dtype=np.float64),
+                         'city': ['SF', 'NY', 'LA'] * (rows // 3) + ['SF'] * (rows % 3)})
+
+
+def build(directory, source, model_version='v1'):
+    encoders = {'city': FrequencyAwareEncoder(min_count=1).fit(['SF', 'NY', 'LA'])}
+    build_feature_store(source, directory, encoders, COLUMNS, model_version, chunk_size=100)
+
+
+def test_every_company_is_found_and_unknown_ids_miss(tmp_path):
+    source = companies(1000)
+    directory = str(tmp_path / 'store')
+    build(directory, source)
+    store = open_feature_store(directory, COLUMNS, 'v1')
+
+    home_slots = uuid_keys(source['uuid_org'])[:, 0] & np.uint64(store.mask)
+    assert len(np.unique(home_slots)) < len(source), 'the test needs colliding home slots'
+
+    for i, uuid in enumerate(source['uuid_org']):
+        assert store.row_index(uuid) == i
+    assert store.vector('org-7')[0] == 7.0
+    assert store.vector('org-1000') is None and store.vector('') is None
+    assert open_feature_store(directory, COLUMNS, 'v2') is None
+
+
+def test_rebuilds_are_published_atomically_and_picked_up(tmp_path):
+    directory = str(tmp_path / 'store')
+    live = LiveFeatureStore(directory, COLUMNS, 'v1', check_interval=0)
+    assert live.current() is None
+
+    build(directory, companies(10))
+    first = live.current()
+    assert first.vector('org-20') is None
+
+    build(directory, companies(30))
+    assert live.current().vector('org-20')[0] == 20.0
+    # The previous version stays readable for workers that still map it
+    assert first.vector('org-5')[0] == 5.0
+
+    build(directory, companies(40))
+    versions = sorted(os.listdir(os.path.join(directory, 'versions')))
+    assert len(versions) == 2 and versions[-1] == current_version(directory)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from functions.models import table_value_counts, stratified_reservoir_sample, categorical_columns
+
+
+def chunked(X, y, chunk_size):
+    for start in range(0, len(X), chunk_size):
+        yield X[start:start + chunk_size], y[start:start + chunk_size]
+
+
+def test_value_counts_over_chunks_match_the_whole_table(tmp_path):
+    rng = np.random.default_rng(0)
+    table = pd.DataFrame({column: rng.choice(['a', 'b', 'c', 'd'], 1000, p=[.5, .3, .15, .05]) for column in categorical_columns})
+    table['outcome'] = rng.choice(['NE', 'FR', 'AC', 'CL'], 1000)
+    path = str(tmp_path / 'table.csv')
+    table.to_csv(path, index=False)
+
+    category_counts, outcome_counts = table_value_counts(path, list(table.columns), chunk_size=77)
+    for column in categorical_columns:
+        pd.testing.assert_series_equal(category_counts[column].sort_index(), table[column].value_counts().sort_index(),
+                                       check_dtype=False, check_names=False)
+    pd.testing.assert_series_equal(outcome_counts.sort_index(), table['outcome'].value_counts().sort_index(),
+                                   check_dtype=False, check_names=False)
+
+
+def test_reservoir_keeps_everything_that_fits():
+    X = np.arange(20, dtype=np.float64).reshape(10, 2)
+    y = np.array([0, 1] * 5, dtype=bool)
+    sample, labels = stratified_reservoir_sample(chunked(X, y, 3), [5, 5], 2, np.random.default_rng(0))
+    np.testing.assert_array_equal(sample, np.vstack([X[~y], X[y]]))
+    np.testing.assert_array_equal(labels, [0] * 5 + [1] * 5)
+
+
+def test_reservoir_is_a_uniform_sample_of_each_class():
+    # 30 negatives and 10 positives in chunks of 7; every row should be kept
+    # with probability capacity / class size
+    y = np.zeros(40, dtype=bool)
+    y[::4] = True
+    X = np.arange(40, dtype=np.float64)[:, None]
+    capacities = [6, 2]
+
+    runs = 4000
+    kept = np.zeros(40)
+    rng = np.random.default_rng(1)
+    for _ in range(runs):
+        sample, labels = stratified_reservoir_sample(chunked(X, y, 7), capacities, 1, rng)
+        assert np.bincount(labels).tolist() == capacities
+        assert (y[sample[:, 0].astype(int)] == labels).all()
+        assert len(np.unique(sample)) == len(sample)
+        kept[sample[:, 0].astype(int)] += 1
+
+    rates = kept / runs
+    # Expected 0.2 for both classes; binomial standard error is about 0.0063
+    np.testing.assert_allclose(rates[~y], 6 / 30, atol=0.03)
+    np.testing.assert_allclose(rates[y], 2 / 10, atol=0.03)
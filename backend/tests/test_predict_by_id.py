@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from startup_benchmark import base_path
+
+BY_ID_PROBE = """
+import json, sys, Screening
+client = Screening.app.test_client()
+results = []
+for payload in json.loads(sys.argv[1]):
+    rows = Screening.drift_monitor.rows
+    response = client.post('/predict/by-id', json=payload)
+    body = response.get_json()
+    results.append({'status': response.status_code, 'overrides': body.get('Overrides'),
+                    'ignored': body.get('Ignored'), 'drift_rows': Screening.drift_monitor.rows - rows})
+print(json.dumps(results))
+"""
+
+
+@pytest.fixture(scope='module')
+def by_id(serving_env):
+    def post(*payloads):
+        env = dict(os.environ, SCREENING_FAST_START='0', SCREENING_API_DOCS='0', **serving_env)
+        output = subprocess.run([sys.executable, '-c', BY_ID_PROBE, json.dumps(payloads)], cwd=base_path,
+                                env=env, capture_output=True, text=True, check=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    return post
+
+
+def test_overrides_list_only_the_fields_the_model_uses(by_id):
+    # The served model only has age_months, num_funding_rounds and city
+    stored, overridden, unused = by_id(
+        {'uuid_org': 'org-1'},
+        {'uuid_org': 'org-1', 'company_age_months': 60, 'company_region': 'California'},
+        {'uuid_org': 'org-1', 'company_region': 'California', 'company_founders_male_count': ''})
+
+    assert stored == {'status': 200, 'overrides': [], 'ignored': [], 'drift_rows': 0}
+    assert overridden == {'status': 200, 'overrides': ['company_age_months'], 'ignored': ['company_region'],
+                          'drift_rows': 1}
+    # Unused fields alone leave the stored row as it is
+    assert unused == {'status': 200, 'overrides': [], 'ignored': ['company_region'], 'drift_rows': 0}
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from functions.request_parsing import (PREDICT_FIELDS, FeatureParser, RequestValidationError,
+                                       parse_int, parse_float)
+
+
+def valid_payload():
+    payload = {}
+    for column, field, kind, required in PREDICT_FIELDS:
+        payload[field] = 'USA' if kind == 'category' else '1'
+    return payload
+
+
+def encode_category(column, value):
+    return 7.0
+
+
+@pytest.mark.parametrize('value, expected', [('1,000', 1000), (' 12 ', 12), (3.0, 3), (5, 5)])
+def test_parse_int(value, expected):
+    assert parse_int(value) == expected
+
+
+@pytest.mark.parametrize('value', [True, False, 2.5, 'nan', 'inf', float('nan'), float('inf'), 'abc'])
+def test_parse_int_rejects(value):
+    with pytest.raises(ValueError):
+        parse_int(value)
+
+
+@pytest.mark.parametrize('value, expected', [('1,000.5', 1000.5), (2, 2.0), ('1e3', 1000.0)])
+def test_parse_float(value, expected):
+    assert parse_float(value) == expected
+
+
+@pytest.mark.parametrize('value', [True, False, 'nan', 'NaN', 'inf', '-Infinity', '1e400', float('nan'), float('-inf')])
+def test_parse_float_rejects(value):
+    with pytest.raises(ValueError):
+        parse_float(value)
+
+
+def test_parser_reports_every_bad_field():
+    column_names = [column for column, _, _, _ in PREDICT_FIELDS]
+    parser = FeatureParser(column_names, encode_category)
+    payload = valid_payload()
+    payload['company_total_funding_usd'] = '1e400'
+    payload['company_age_months'] = True
+    payload['company_round_count'] = 10 ** 400
+    del payload['company_city']
+
+    with pytest.raises(RequestValidationError) as error:
+        parser.parse(payload)
+    assert sorted(detail['field'] for detail in error.value.details) == [
+        'company_age_months', 'company_city', 'company_round_count', 'company_total_funding_usd']
+
+
+def test_parser_fills_the_row_in_column_order():
+    column_names = [column for column, _, _, _ in reversed(PREDICT_FIELDS)]
+    parser = FeatureParser(column_names, encode_category)
+    row = parser.parse(valid_payload())
+    assert row.shape == (1, len(column_names))
+    expected = [7.0 if kind == 'category' else 1.0 for _, _, kind, _ in reversed(PREDICT_FIELDS)]
+    np.testing.assert_array_equal(row[0], expected)
+
+
+def test_fields_dropped_by_compaction_are_still_validated():
+    encoded = []
+
+    def encode(column, value):
+        encoded.append(column)
+        return 7.0
+
+    parser = FeatureParser(['age_months', 'city'], encode)
+    payload = valid_payload()
+    payload['company_age_months'] = '30'
+    np.testing.assert_array_equal(parser.parse(payload)[0], [30.0, 7.0])
+    assert encoded == ['city']
+
+    payload['company_num_funding_rounds'] = 'oops'
+    del payload['company_region']
+    with pytest.raises(RequestValidationError) as error:
+        parser.parse(payload)
+    assert sorted(detail['field'] for detail in error.value.details) == ['company_num_funding_rounds', 'company_region']
+
+
+def test_model_fields_are_the_fields_written_to_the_row():
+    parser = FeatureParser(['age_months', 'city'], encode_category)
+    assert sorted(parser.model_fields) == ['company_age_months', 'company_city']
+    # Every field is still validated
+    assert len(parser.fields) == len(PREDICT_FIELDS)
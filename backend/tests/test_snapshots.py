@@ -0,0 +1,111 @@
+import os
+import pandas as pd
+
+from functions.snapshots import load_snapshot_tables, build_snapshot, build_feature_snapshots
+
+SIM_START = '2019-01-01'
+TABLES = ('organizations', 'funding_rounds', 'acquisitions', 'ipos', 'investments', 'people', 'degrees')
+
+
+def raw_tables():
+    # Two companies founded in the warmup window, with events on both sides of SIM_START
+    organizations = pd.DataFrame({
+        'uuid': ['a', 'b'], 'name': ['A', 'B'], 'permalink': ['a', 'b'], 'domain': 'company',
+        'country_code': 'USA', 'region': 'California', 'city': 'SF', 'category_list': 'AI',
+        'founded_on': ['2016-03-01', '2017-06-01'], 'closed_on': [None, None],
+        'facebook_url': ['fb', None], 'twitter_url': None, 'linkedin_url': None,
+        'status': 'operating', 'num_funding_rounds': [2, 0], 'total_funding_usd': [300.0, 0.0],
+        'total_funding': [300.0, 0.0], 'total_funding_currency_code': 'USD',
+        'last_funding_on': ['2018-05-01', None],
+    })
+    funding_rounds = pd.DataFrame({
+        'uuid': ['r1', 'r2'], 'org_uuid': ['a', 'a'], 'announced_on': ['2017-01-01', '2018-05-01'],
+        'investment_type': ['seed', 'series_a'], 'raised_amount_usd': [100.0, 200.0],
+        'post_money_valuation_usd': [1000.0, 3000.0],
+    })
+    return {
+        'organizations': organizations,
+        'funding_rounds': funding_rounds,
+        'acquisitions': pd.DataFrame({'acquiree_uuid': pd.Series([], dtype=str), 'acquired_on': pd.Series([], dtype=str)}),
+        'ipos': pd.DataFrame({'org_uuid': pd.Series([], dtype=str), 'went_public_on': pd.Series([], dtype=str)}),
+        'investments': pd.DataFrame({'funding_round_uuid': ['r1', 'r2', 'r2'], 'investor_uuid': ['i1', 'i1', 'i2']}),
+        'people': pd.DataFrame({'uuid': ['p1'], 'gender': ['female'], 'country_code': ['USA'],
+                                'featured_job_organization_uuid': ['a'], 'featured_job_title': ['CEO']}),
+        'degrees': pd.DataFrame({'uuid': ['d1'], 'person_uuid': ['p1']}),
+    }
+
+
+def write_tables(directory, tables):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name in TABLES:
+        path = os.path.join(directory, f'{name}.csv')
+        tables[name].to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def add_future_events(tables):
+    # Everything the export knows that happened after SIM_START
+    tables = {name: table.copy() for name, table in tables.items()}
+    organizations = tables['organizations']
+    organizations['num_funding_rounds'] = [4, 1]
+    organizations['total_funding_usd'] = [5300.0, 50.0]
+    organizations['total_funding'] = [5300.0, 50.0]
+    organizations['last_funding_on'] = ['2020-02-01', '2019-03-01']
+    organizations['status'] = ['acquired', 'closed']
+    organizations['closed_on'] = [None, '2021-01-01']
+    tables['funding_rounds'] = pd.concat([tables['funding_rounds'], pd.DataFrame({
+        'uuid': ['r3', 'r4', 'r5'], 'org_uuid': ['a', 'a', 'b'],
+        'announced_on': ['2019-01-01', '2020-02-01', '2019-03-01'],
+        'investment_type': ['series_b', 'series_c', 'seed'], 'raised_amount_usd': [1000.0, 4000.0, 50.0],
+        'post_money_valuation_usd': [9000.0, 20000.0, 500.0],
+    })], ignore_index=True)
+    tables['investments'] = pd.concat([tables['investments'], pd.DataFrame({
+        'funding_round_uuid': ['r3', 'r4', 'r5'], 'investor_uuid': ['i3', 'i4', 'i5']})], ignore_index=True)
+    tables['acquisitions'] = pd.DataFrame({'acquiree_uuid': ['a'], 'acquired_on': ['2021-06-01']})
+    return tables
+
+
+def snapshot_for(directory, tables):
+    return build_snapshot(load_snapshot_tables(*write_tables(directory, tables)), SIM_START).set_index('uuid_org')
+
+
+def test_funding_columns_are_as_of_the_snapshot(tmp_path):
+    snapshot = snapshot_for(tmp_path / 'past', add_future_events(raw_tables()))
+
+    assert snapshot.loc['a', 'num_funding_rounds'] == 2
+    assert snapshot.loc['a', 'total_funding_usd'] == 300.0
+    assert snapshot.loc['a', 'last_funding_on'] == pd.Timestamp('2018-05-01')
+    assert snapshot.loc['a', 'last_round_investment_type'] == 'series_a'
+    assert snapshot.loc['a', 'investor_countwup'] == 2
+    assert snapshot.loc['b', 'num_funding_rounds'] == 0
+    assert pd.isna(snapshot.loc['b', 'last_funding_on'])
+    assert (snapshot['status'] == 'operating').all()
+    assert snapshot['closed_on'].isna().all()
+
+
+def test_no_feature_depends_on_events_after_the_cutoff(tmp_path):
+    before = snapshot_for(tmp_path / 'before', raw_tables())
+    after = snapshot_for(tmp_path / 'after', add_future_events(raw_tables()))
+
+    # Only the label may look past SIM_START
+    assert before.loc['a', 'outcome'] == 'NE' and after.loc['a', 'outcome'] == 'AC'
+    assert after.loc['b', 'outcome'] == 'CL'
+    pd.testing.assert_frame_equal(before.drop(columns='outcome'), after.drop(columns='outcome'), check_dtype=False)
+
+
+def test_cache_is_keyed_by_windows_and_inputs(tmp_path):
+    paths = write_tables(tmp_path / 'raw', raw_tables())
+    cache_dir = str(tmp_path / 'cache')
+
+    build_feature_snapshots([SIM_START], *paths, cache_dir=cache_dir)
+    build_feature_snapshots([SIM_START], *paths, warmup_years=2, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 2
+
+    # New raw files must not be answered from the cache
+    paths = write_tables(tmp_path / 'raw', add_future_events(raw_tables()))
+    os.utime(paths[1], ns=(0, 0))
+    snapshot = build_feature_snapshots([SIM_START], *paths, cache_dir=cache_dir)[pd.Timestamp(SIM_START)]
+    assert len(os.listdir(cache_dir)) == 3
+    assert snapshot.set_index('uuid_org').loc['a', 'outcome'] == 'AC'
@@ -0,0 +1,56 @@
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+import pytest
+
+from startup_benchmark import measure_startup, base_path, SERVING_OBJECTS
+
+
+def test_fast_start_import_loads_the_model_and_skips_training_only_modules(serving_env):
+    # Set STARTUP_BUDGET_SECONDS to also enforce the import-time budget
+    timings, loaded, ready = measure_startup(runs=1, env=serving_env)
+    assert loaded == []
+    assert ready == SERVING_OBJECTS
+    budget = os.environ.get('STARTUP_BUDGET_SECONDS')
+    if budget:
+        assert statistics.median(timings) <= float(budget)
+
+
+def test_startup_without_a_model(tmp_path):
+    timings, loaded, ready = measure_startup(runs=1, env={'SCREENING_MODEL_DIR': str(tmp_path)})
+    assert loaded == [] and ready == []
+
+
+API_DOCS_PROBE = """
+import json, Screening
+client = Screening.app.test_client()
+docs = client.get('/apidocs/')
+spec = client.get('/apispec_1.json')
+print(json.dumps({'swagger': Screening.swagger is not None, 'docs': docs.status_code,
+                  'spec': spec.get_json() if spec.status_code == 200 else None}))
+"""
+
+
+@pytest.mark.parametrize('fast_start, api_docs, expected', [
+    ('1', None, True), ('1', '0', False), ('0', None, True), ('0', '0', False),
+])
+def test_api_docs_setting(fast_start, api_docs, expected, tmp_path):
+    env = dict(os.environ, SCREENING_FAST_START=fast_start, SCREENING_MODEL_DIR=str(tmp_path))
+    env.pop('SCREENING_API_DOCS', None)
+    if api_docs is not None:
+        env['SCREENING_API_DOCS'] = api_docs
+    output = subprocess.run([sys.executable, '-c', API_DOCS_PROBE], cwd=base_path, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    assert result['swagger'] is expected
+    assert result['docs'] == (200 if expected else 404)
+    if expected:
+        assert '/predict' in result['spec']['paths']
+    if expected and fast_start == '1':
+        # The interactive docs load the prebuilt spec
+        with open(os.path.join(base_path, '..', 'openapi.json')) as file:
+            assert result['spec'] == json.load(file)
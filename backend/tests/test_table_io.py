@@ -0,0 +1,80 @@
+import sys
+import pandas as pd
+import pytest
+
+from functions.table_io import read_matching_rows
+
+# Column types depend on rows other than the matching ones: employee_count
+# is only float because b2 is blank, is_active is only an object column
+# because d4 is blank, and closed_on is empty everywhere
+CSV = (
+    'uuid_org,name_org,city,employee_count,short_description,is_active,rank,closed_on\n'
+    'a1,"Acme, Inc.",SF,10,"Makes anvils, mostly",True,1.5,\n'
+    'b2,Beta,,,,False,2,""\n'
+    'c3,"Gamma ""G"" Labs","",25,"",True,NA,\n'
+    'd4,Delta,NY,7,"Two\nlines",,3,\n'
+    'e5,,LA,3,Plain,false,4,\n'
+    'a1,"Acme, Inc.",Oakland,11,Duplicate key,TRUE,5,\n'
+)
+
+
+@pytest.fixture(params=['arrow-csv', 'parquet', 'pandas-csv'])
+def table(request, tmp_path, monkeypatch):
+    path = tmp_path / 'companies.csv'
+    path.write_text(CSV)
+    expected = pd.read_csv(path)
+    if request.param == 'parquet':
+        path = tmp_path / 'companies.parquet'
+        expected.to_parquet(path, index=False)
+        expected = pd.read_parquet(path)
+    elif request.param == 'pandas-csv':
+        # Importing pyarrow now fails, as if it were not installed
+        monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    return str(path), expected
+
+
+@pytest.mark.parametrize('keys', [
+    ['a1', 'c3'],
+    ['b2', 'd4', 'e5'],
+    ['c3', 'c3', None],
+    ['zz', 'yy'],
+    [],
+])
+def test_read_matching_rows_matches_a_full_read(table, keys):
+    path, full = table
+    expected = full[full['uuid_org'].isin([key for key in keys if key is not None])].reset_index(drop=True)
+
+    result = read_matching_rows(path, 'uuid_org', keys, chunk_size=2)
+    pd.testing.assert_frame_equal(result, expected, check_index_type=bool(len(expected)))
+
+
+def test_read_matching_rows_reads_only_the_requested_columns(table):
+    path, full = table
+    columns = ['uuid_org', 'name_org', 'short_description']
+    expected = full.loc[full['uuid_org'].isin(['a1', 'c3']), columns].reset_index(drop=True)
+
+    result = read_matching_rows(path, 'uuid_org', ['a1', 'c3'], columns=columns, chunk_size=2)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_parquet_columns_keep_their_whole_file_types(tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = str(tmp_path / 'rounds.parquet')
+    # Written by pyarrow directly, without pandas metadata, in two row groups
+    table = pa.table({'org_uuid': ['a', 'b', 'c', 'd'],
+                      'investor_count': pa.array([1, 2, None, 4], type=pa.int64()),
+                      'is_lead': pa.array([True, False, True, None]),
+                      'amount': pa.array([1, 2, 3, 4], type=pa.int64())})
+    pq.write_table(table, path, row_group_size=2)
+    full = pd.read_parquet(path)
+    assert full['investor_count'].dtype == 'float64' and full['is_lead'].dtype == object
+
+    result = read_matching_rows(path, 'org_uuid', ['a', 'b'])
+    pd.testing.assert_frame_equal(result, full.iloc[:2])
+
+    # Nullable extension dtypes from pandas metadata are left alone
+    frame = pd.DataFrame({'org_uuid': ['a', 'b'], 'employees': pd.array([1, None], dtype='Int64')})
+    frame.to_parquet(path, index=False)
+    pd.testing.assert_frame_equal(read_matching_rows(path, 'org_uuid', ['a']), pd.read_parquet(path).iloc[:1])
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.metrics import log_loss
+from sklearn.model_selection import StratifiedKFold
+
+from functions.tuning import successive_halving_search
+
+PARAM_GRID = {
+    'learning_rate': [0.05, 0.1, 0.3],
+    'max_depth': [1, 2, 3],
+    'subsample': [0.7, 1.0],
+    'max_features': [None, 'sqrt'],
+}
+
+
+@pytest.fixture(scope='module')
+def search():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(240, 5))
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + 0.5 * rng.normal(size=240) > 0).astype(int)
+    cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=0)
+    results = successive_halving_search(X, y, cv, param_grid=PARAM_GRID, n_candidates=9,
+                                        min_estimators=3, max_estimators=27, eta=3, n_jobs=1, random_state=7)
+    return X, y, cv, results
+
+
+def test_rungs_shrink_by_eta(search):
+    X, y, cv, results = search
+    history = results['history']
+    assert [rung['n_estimators'] for rung in history] == [3, 9, 27]
+    assert [len(rung['candidates']) for rung in history] == [9, 3, 1]
+    # Each rung grows the best of the previous one (and re-ranks them)
+    for previous, rung in zip(history, history[1:]):
+        kept = previous['candidates'][:len(rung['candidates'])]
+        assert sorted(str(candidate['params']) for candidate in rung['candidates']) == \
+            sorted(str(candidate['params']) for candidate in kept)
+    assert results['params'] == history[-1]['candidates'][0]['params']
+
+
+def test_fold_curves_match_a_fresh_fit_of_the_winner(search):
+    X, y, cv, results = search
+    assert results['fold_curves'].shape == (3, 27)
+    # With subsampling, this also checks that growing a model rung by rung
+    # with warm_start draws the same subsamples as fitting it in one go
+    assert results['params']['subsample'] < 1
+
+    for fold, (train_index, test_index) in enumerate(cv.split(X, y)):
+        X_train = X[train_index].astype(np.float32)
+        X_test = X[test_index].astype(np.float32)
+        model = GradientBoostingClassifier(**results['params'], n_estimators=27, random_state=7).fit(X_train, y[train_index])
+        expected = [log_loss(y[test_index], proba[:, 1], labels=[0, 1]) for proba in model.staged_predict_proba(X_test)]
+        np.testing.assert_allclose(results['fold_curves'][fold], expected, rtol=1e-9)
+
+
+def test_best_stage_and_metrics_come_from_the_mean_curve(search):
+    X, y, cv, results = search
+    mean_curve = results['fold_curves'].mean(axis=0)
+    assert results['n_estimators'] == int(mean_curve.argmin()) + 1
+    assert results['cv_metrics']['log_loss'] == pytest.approx(mean_curve.min())
+    assert 0.5 < results['cv_metrics']['roc_auc'] <= 1.0
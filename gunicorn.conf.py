@@ -0,0 +1,30 @@
+import gc
+import os
+import uuid
+
+# Fast-start configuration for the web workers.
+#
+# The app (model artifacts, encoders and any loaded dataset) is imported once
+# in the master and shared copy-on-write with the forked workers. gc.freeze()
+# moves everything allocated so far into the permanent generation so that the
+# workers' garbage collections never touch (and so never copy) those pages.
+
+os.environ.setdefault('SCREENING_FAST_START', '1')
+
+# One id per server start, shared by all workers, so that /model/drift only
+# merges the drift counts of the current workers (see functions/drift.py)
+os.environ.setdefault('SCREENING_BOOT_ID', uuid.uuid4().hex[:12])
+
+# Screening.py imports its helpers as `functions.*`
+pythonpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before any worker forks
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Froze {gc.get_freeze_count()} objects before forking workers")